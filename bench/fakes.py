@@ -0,0 +1,241 @@
+# In-memory stand-ins for Google Sheets and the Telegram Bot API
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import gspread
+import requests
+from gspread.utils import a1_range_to_grid_range, a1_to_rowcol
+from sheets.index import DATE_FORMAT
+
+HEADER = [
+    "Start Date", "Deadline", "Topic", "Subtopic", "Language Focus",
+    "Resource Link", "Project Idea", "Notes", "Status",
+]
+
+
+# A roadmap of `rows` tasks, ~tasks_per_day per day, centred on today, with
+# `extra_columns` columns the bot never reads (owners, estimates, comments...)
+def synthetic_roadmap(rows: int, tasks_per_day: int = 10, today: Optional[datetime] = None,
+                      extra_columns: int = 0) -> List[List[str]]:
+    today = today or datetime.now()
+    first_day = today - timedelta(days=rows // tasks_per_day // 2)
+    values = [list(HEADER) + [f"Extra {c}" for c in range(extra_columns)]]
+    for i in range(rows):
+        start = first_day + timedelta(days=i // tasks_per_day)
+        started = start.date() < today.date()
+        values.append([
+            start.strftime(DATE_FORMAT),
+            (start + timedelta(days=3)).strftime(DATE_FORMAT),
+            f"Topic {i}",
+            f"Subtopic {i} with a longer description",
+            "Python",
+            f"https://example.com/{i}/docs and https://example.com/{i}/video",
+            "-" if i % 3 else f"Build project {i}",
+            "" if i % 4 else f"Note for task {i}",
+            # Past rows: some done, some still Pending (to be marked Missed)
+            ("Pending" if i % 2 else "Done") if started else "",
+        ] + [f"Extra value {c} of task {i}" for c in range(extra_columns)])
+    return values
+
+
+def _api_error(code: int, message: str) -> gspread.exceptions.APIError:
+    response = requests.Response()
+    response.status_code = code
+    response._content = json.dumps({"error": {"code": code, "message": message, "status": "RESOURCE_EXHAUSTED"}}).encode()
+    return gspread.exceptions.APIError(response)
+
+
+class FakeWorksheet:
+    """A gspread.Worksheet backed by a list of rows.
+
+    Counts calls per method and approximate bytes in each direction, sleeps
+    ``latency`` seconds per call and raises a 429 quota error once more than
+    ``write_quota`` writes land within a minute.
+    """
+
+    def __init__(self, values: List[List[str]], title: str = "ROADMAP", latency: float = 0.0,
+                 write_quota: Optional[int] = None):
+        self.values = values
+        self.title = title
+        self.id = 0
+        self.latency = latency
+        self.write_quota = write_quota
+        self.calls: Dict[str, int] = {}
+        self.bytes_in = 0  # sent to "Google"
+        self.bytes_out = 0  # received from "Google"
+        self.quota_errors = 0
+        self._writes: List[float] = []
+        self.spreadsheet = FakeSpreadsheet(self)
+
+    def _call(self, name: str, request=None):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if request is not None:
+            self.bytes_in += len(json.dumps(request))
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _reply(self, response):
+        self.bytes_out += len(json.dumps(response))
+        return response
+
+    def _write(self):
+        now = time.monotonic()
+        self._writes = [t for t in self._writes if now - t < 60] + [now]
+        if self.write_quota is not None and len(self._writes) > self.write_quota:
+            self.quota_errors += 1
+            raise _api_error(429, "Quota exceeded for quota metric 'Write requests'")
+
+    def get_all_values(self, *args, **kwargs) -> List[List[str]]:
+        self._call("get_all_values")
+        return self._reply([list(row) for row in self.values])
+
+    # Like values:batchGet, trailing empty rows and cells are left out
+    def batch_get(self, ranges, major_dimension=None, **kwargs) -> List[List[List[str]]]:
+        ranges = list(ranges)
+        self._call("batch_get", ranges)
+        results = []
+        for name in ranges:
+            grid = a1_range_to_grid_range(name.split("!")[-1])
+            rows = self.values[grid.get("startRowIndex", 0):grid.get("endRowIndex", len(self.values))]
+            start_col = grid.get("startColumnIndex", 0)
+            end_col = grid.get("endColumnIndex")
+            block = [row[start_col:end_col] if end_col is not None else row[start_col:] for row in rows]
+            if major_dimension == "COLUMNS":
+                width = max((len(row) for row in block), default=0)
+                block = [[row[c] if c < len(row) else "" for row in block] for c in range(width)]
+            block = [self._trim(line) for line in block]
+            while block and not block[-1]:
+                block.pop()
+            results.append(block)
+        return self._reply(results)
+
+    @staticmethod
+    def _trim(line: List[str]) -> List[str]:
+        line = list(line)
+        while line and line[-1] == "":
+            line.pop()
+        return line
+
+    def update_cell(self, row: int, col: int, value: str):
+        self._call("update_cell", [row, col, value])
+        self._write()
+        self._set(row, col, value)
+        return self._reply({"updatedRange": f"{self.title}!{gspread.utils.rowcol_to_a1(row, col)}"})
+
+    def batch_update(self, data, **kwargs):
+        data = list(data)
+        self._call("batch_update", data)
+        self._write()
+        responses = []
+        for item in data:
+            start = item["range"].split("!")[-1].split(":")[0]
+            row, col = a1_to_rowcol(start)
+            for r, values in enumerate(item["values"]):
+                for c, value in enumerate(values):
+                    self._set(row + r, col + c, value)
+            responses.append({"updatedRange": f"'{self.title}'!{item['range']}", "updatedCells": 1})
+        return self._reply({"totalUpdatedCells": len(data), "responses": responses})
+
+    def _set(self, row: int, col: int, value: str):
+        while len(self.values) < row:
+            self.values.append([])
+        line = self.values[row - 1]
+        while len(line) < col:
+            line.append("")
+        line[col - 1] = value
+
+
+class FakeSpreadsheet:
+    def __init__(self, worksheet: FakeWorksheet):
+        self.worksheet_ = worksheet
+        self.id = "fake-spreadsheet"
+        self.modified_time = datetime.now().isoformat()
+
+    def get_lastUpdateTime(self) -> str:
+        self.worksheet_._call("get_lastUpdateTime")
+        return self.modified_time
+
+
+class FakeClientManager:
+    """Hands out fake worksheets in place of SheetsClientManager."""
+
+    def __init__(self, worksheets: Dict[str, FakeWorksheet]):
+        self.worksheets = worksheets
+        self.calls = 0
+
+    def worksheet(self, spreadsheet_id: str, sheet_name: str) -> FakeWorksheet:
+        self.calls += 1
+        if sheet_name not in self.worksheets:
+            raise gspread.exceptions.WorksheetNotFound(sheet_name)
+        return self.worksheets[sheet_name]
+
+    def invalidate(self, *args, **kwargs):
+        pass
+
+
+class FakeMessage:
+    def __init__(self, chat_id: str, message_id: int, reply_markup=None):
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.reply_markup = reply_markup
+
+
+class FakeBot:
+    """Records Bot API calls; each takes ``latency`` seconds."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: Dict[str, int] = {}
+        self.bytes_sent = 0
+        self._message_id = 0
+
+    async def _call(self, name: str, **kwargs) -> FakeMessage:
+        self.calls[name] = self.calls.get(name, 0) + 1
+        markup = kwargs.get("reply_markup")
+        self.bytes_sent += len(kwargs.get("text", "")) + (len(json.dumps(markup.to_dict())) if markup else 0)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self._message_id += 1
+        return FakeMessage(kwargs["chat_id"], kwargs.get("message_id", self._message_id))
+
+    async def send_message(self, chat_id, text, **kwargs):
+        return await self._call("send_message", chat_id=chat_id, text=text, **kwargs)
+
+    async def edit_message_text(self, chat_id, message_id, text, **kwargs):
+        return await self._call("edit_message_text", chat_id=chat_id, message_id=message_id, text=text, **kwargs)
+
+    async def edit_message_reply_markup(self, chat_id, message_id, **kwargs):
+        return await self._call("edit_message_reply_markup", chat_id=chat_id, message_id=message_id, **kwargs)
+
+
+class FakeApplication:
+    def __init__(self, bot: FakeBot):
+        self.bot = bot
+        self.bot_data: Dict = {}
+
+
+class FakeCallbackQuery:
+    def __init__(self, data: str, message: FakeMessage):
+        self.data = data
+        self.message = message
+
+    async def answer(self, *args, **kwargs):
+        pass
+
+    async def edit_message_text(self, text, **kwargs):
+        pass
+
+    async def edit_message_reply_markup(self, reply_markup=None, **kwargs):
+        pass
+
+
+class FakeUpdate:
+    def __init__(self, data: str, chat_id: str = "1", message_id: int = 1, reply_markup=None):
+        self.callback_query = FakeCallbackQuery(data, FakeMessage(chat_id, message_id, reply_markup))
+
+
+class FakeContext:
+    def __init__(self, application: FakeApplication):
+        self.application = application
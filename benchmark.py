@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Benchmark a daily run against in-memory fakes of Google Sheets and Telegram.
+
+Usage:
+    python benchmark.py                       # 100, 1k and 10k rows
+    python benchmark.py --rows 1000 --latency 0.05 --json bench_output.txt
+
+For each roadmap size it runs send_daily_summary, a burst of handle_button
+presses, mark_previous_pending_as_missed and a cache reload after a few
+edits in the sheet, and reports wall time, Sheets and Bot API call counts,
+bytes transferred and peak Python memory. --sync incremental reloads through
+the incremental mirror instead of re-downloading the sheet. --extra-columns
+widens the sheet with columns the bot does not read.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+# Settings are read on first use; the fakes need no real credentials
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+os.environ.setdefault("SPREADSHEET_ID", "benchmark")
+os.environ.setdefault("SERVICE_ACCOUNT_PATH", "benchmark.json")
+os.environ.setdefault("SUBSCRIPTIONS_PATH", os.path.join(tempfile.mkdtemp(), "subscriptions.json"))
+os.environ.setdefault("ALLOWED_CHAT_IDS", "")  # the fake chats are not on any allowlist
+
+from bench.fakes import (
+    FakeApplication,
+    FakeBot,
+    FakeClientManager,
+    FakeContext,
+    FakeUpdate,
+    FakeWorksheet,
+    synthetic_roadmap,
+)
+from bot.handler import handle_button
+from bot.ratelimit import RateLimiter
+from bot.send_queue import SendQueue
+from bot.sender import create_inline_buttons, send_daily_summary
+from config.settings import ROADMAP_CACHE_TTL
+from sheets.client import set_client_manager
+from sheets.roadmap import RoadmapSnapshot, get_roadmap_cache, mark_previous_pending_as_missed
+
+UNLIMITED = 1e9  # rate limits off: we measure our own cost, not Telegram's limits
+
+
+class Environment:
+    """A fresh fake sheet, bot and cache for one scenario."""
+
+    def __init__(self, rows: int, latency: float, bot_latency: float, write_quota, sync: str, extra_columns: int = 0):
+        self.sheet = FakeWorksheet(synthetic_roadmap(rows, extra_columns=extra_columns), latency=latency,
+                                   write_quota=write_quota)
+        self.manager = FakeClientManager({"ROADMAP": self.sheet})
+        set_client_manager(self.manager)
+        cache = get_roadmap_cache()
+        cache.invalidate()
+        cache.ttl = ROADMAP_CACHE_TTL
+        cache.incremental = sync == "incremental"
+
+        self.bot = FakeBot(bot_latency)
+        self.app = FakeApplication(self.bot)
+        self.app.bot_data["send_queue"] = SendQueue(self.bot, RateLimiter(UNLIMITED, UNLIMITED, UNLIMITED))
+
+    def report(self):
+        return {
+            "sheets_calls": dict(self.sheet.calls),
+            "sheets_bytes_in": self.sheet.bytes_in,
+            "sheets_bytes_out": self.sheet.bytes_out,
+            "quota_errors": self.sheet.quota_errors,
+            "bot_calls": dict(self.bot.calls),
+            "bot_bytes": self.bot.bytes_sent,
+            "cache": get_roadmap_cache().stats(),
+        }
+
+
+async def scenario_daily_summary(env: Environment, presses: int):
+    await send_daily_summary(env.app, "1")
+
+
+async def scenario_button_presses(env: Environment, presses: int):
+    # Callback data exactly as the summary's keyboard encodes it
+    today = datetime.now().strftime("%d-%m-%Y")
+    with contextlib.redirect_stdout(io.StringIO()):
+        tasks = RoadmapSnapshot.load().today_tasks(today)
+    env.sheet.calls.clear()
+    env.sheet.bytes_in = env.sheet.bytes_out = 0
+
+    # The user taps through the buttons of one summary message
+    markup = create_inline_buttons(tasks[:presses])
+    updates = [FakeUpdate(row[0].callback_data, reply_markup=markup) for row in markup.inline_keyboard]
+    context = FakeContext(env.app)
+    await asyncio.gather(*[handle_button(update, context) for update in updates])
+
+
+async def scenario_mark_missed(env: Environment, presses: int):
+    mark_previous_pending_as_missed(datetime.now())
+
+
+async def scenario_reload(env: Environment, presses: int):
+    # A full day's cycle on a warm cache: someone edits a few statuses in the
+    # sheet, the entry expires and the roadmap is loaded again
+    cache = get_roadmap_cache()
+    cache.get()
+    status_col = env.sheet.values[0].index("Status")
+    for row in env.sheet.values[1:presses + 1]:
+        row[status_col] = "Done"
+    cache.ttl = 0
+    cache.get()
+
+
+SCENARIOS = {
+    "send_daily_summary": scenario_daily_summary,
+    "handle_button": scenario_button_presses,
+    "mark_previous_pending_as_missed": scenario_mark_missed,
+    "reload": scenario_reload,
+}
+
+
+def run_scenario(name: str, rows: int, args) -> dict:
+    # Timed run
+    env = Environment(rows, args.latency, args.bot_latency, args.write_quota, args.sync, args.extra_columns)
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        asyncio.run(SCENARIOS[name](env, args.presses))
+        wall = time.perf_counter() - started
+    result = {"scenario": name, "rows": rows, "wall_ms": round(wall * 1000, 2)}
+    result.update(env.report())
+
+    # Separate traced run: tracemalloc slows everything down, so it is not timed
+    env = Environment(rows, 0.0, 0.0, None, args.sync, args.extra_columns)
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracemalloc.start()
+        asyncio.run(SCENARIOS[name](env, args.presses))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    result["peak_memory_kb"] = round(peak / 1024, 1)
+    return result
+
+
+def print_table(results):
+    print(f"{'scenario':<34}{'rows':>7}{'wall ms':>11}{'sheets calls':>14}{'KB in':>9}{'KB out':>10}"
+          f"{'bot calls':>11}{'peak KB':>11}")
+    for r in results:
+        print(f"{r['scenario']:<34}{r['rows']:>7}{r['wall_ms']:>11}{sum(r['sheets_calls'].values()):>14}"
+              f"{r['sheets_bytes_in'] / 1024:>9.1f}{r['sheets_bytes_out'] / 1024:>10.1f}"
+              f"{sum(r['bot_calls'].values()):>11}{r['peak_memory_kb']:>11}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), nargs="+", default=list(SCENARIOS))
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every Sheets call")
+    parser.add_argument("--bot-latency", type=float, default=0.0, help="seconds added to every Bot API call")
+    parser.add_argument("--write-quota", type=int, default=None, help="Sheets writes allowed per minute")
+    parser.add_argument("--presses", type=int, default=10, help="Done buttons pressed in handle_button")
+    parser.add_argument("--sync", choices=["full", "incremental"], default="full",
+                        help="how the roadmap cache reloads an expired sheet (ROADMAP_SYNC)")
+    parser.add_argument("--extra-columns", type=int, default=0, help="columns the bot does not read, to widen the sheet")
+    parser.add_argument("--json", help="also write the full results as JSON to this file")
+    args = parser.parse_args()
+
+    results = [run_scenario(name, rows, args) for rows in args.rows for name in args.scenario]
+    print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nFull results written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
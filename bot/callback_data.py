@@ -0,0 +1,41 @@
+# Compact callback_data for the inline "Done" buttons
+import base64
+import hashlib
+from typing import Optional, Tuple
+from sheets.roadmap import RoadmapSnapshot, task_key
+from sheets.task import Task
+
+# Telegram rejects callback_data longer than 64 bytes. "d:<row>:<digest>"
+# stays around 20 bytes whatever the topic, and the row lets the handler go
+# straight to the task; the digest of the task key catches rows that moved.
+DONE_PREFIX = "d"
+LEGACY_DONE_PREFIX = "done|"  # done|<Start Date>::<Topic>, as older messages carry
+
+
+# Short, URL-safe digest of a task key
+def task_digest(task: Task) -> str:
+    digest = hashlib.blake2b(task_key(task).encode(), digest_size=6).digest()
+    return base64.urlsafe_b64encode(digest).decode()
+
+
+def encode_done(task: Task) -> str:
+    if task.row is None:
+        return f"{LEGACY_DONE_PREFIX}{task_key(task)}"
+    return f"{DONE_PREFIX}:{task.row}:{task_digest(task)}"
+
+
+# (row, digest) from compact data, or None if `data` is not a compact Done button
+def parse_done(data: str) -> Optional[Tuple[int, str]]:
+    parts = data.split(":")
+    if len(parts) != 3 or parts[0] != DONE_PREFIX or not parts[1].isdigit():
+        return None
+    return int(parts[1]), parts[2]
+
+
+# The task a button points at: its row if the task is still there, else the
+# row the task has moved to; None once it is gone from the sheet
+def resolve_done(snapshot: RoadmapSnapshot, row: int, digest: str) -> Optional[Task]:
+    position = row - 2  # -2 for header offset
+    if 0 <= position < len(snapshot.tasks) and task_digest(snapshot.tasks[position]) == digest:
+        return snapshot.tasks[position]
+    return next((task for task in snapshot.tasks if task_digest(task) == digest), None)
@@ -0,0 +1,98 @@
+# When each chat gets its daily summary: chats are grouped into buckets by
+# (time zone, local delivery time), and each bucket runs as its own daily job
+import hashlib
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional
+import pytz
+from bot.job_runs import daily_occurrences, last_daily_occurrence
+from bot.subscriptions import Subscription
+
+# Constants
+DAILY_SUMMARY_JOB = "daily_summary"  # bucket jobs are named "daily_summary:<time zone>@<HH:MM>"
+PRECOMPUTE_JOB = "precompute_summaries"
+PRECOMPUTE_LEAD = timedelta(minutes=5)  # summaries are rendered this long before a bucket's send
+CHATS_PER_SECOND = 25  # spread a bucket's sends at about this rate, under Telegram's 30 messages/s
+
+_TIME = re.compile(r"^(\d{1,2}):(\d{2})$")
+
+
+# "7:05" -> "07:05"; None if it is not a valid 24-hour HH:MM time
+def parse_delivery_time(value: str) -> Optional[str]:
+    match = _TIME.match(value.strip())
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2))
+    if hour > 23 or minute > 59:
+        return None
+    return f"{hour:02d}:{minute:02d}"
+
+
+@dataclass(frozen=True)
+class DeliveryBucket:
+    """Chats that get their summary at the same local time in the same time zone.
+
+    They share one scheduled job, one job-run log entry and one "today", so
+    a bucket is sent as a single fan-out however many chats it holds.
+    """
+
+    timezone: str
+    delivery_time: str  # "HH:MM", local to the time zone
+
+    @classmethod
+    def of(cls, subscription: Subscription) -> "DeliveryBucket":
+        return cls(subscription.timezone, subscription.delivery_time)
+
+    @property
+    def key(self) -> str:
+        return f"{self.timezone}@{self.delivery_time}"
+
+    @property
+    def job_name(self) -> str:
+        return f"{DAILY_SUMMARY_JOB}:{self.key}"
+
+    @property
+    def precompute_job_name(self) -> str:
+        return f"{PRECOMPUTE_JOB}:{self.key}"
+
+    # The local delivery time as an aware time, for run_daily (DST is handled
+    # by the scheduler, so the send stays at the same wall-clock time all year)
+    def at(self, lead: timedelta = timedelta(0)) -> time:
+        hour, minute = map(int, self.delivery_time.split(":"))
+        local = datetime.combine(date.min + timedelta(days=1), time(hour, minute)) - lead
+        return local.time().replace(tzinfo=pytz.timezone(self.timezone))
+
+    # Delivery times after `since` and up to `now`, oldest first
+    def occurrences(self, since: datetime, now: datetime) -> List[datetime]:
+        return daily_occurrences(self.at(), since, now)
+
+    def last_occurrence(self, now: datetime) -> datetime:
+        return last_daily_occurrence(self.at(), now)
+
+    # The bucket's calendar day at an (aware) moment
+    def today(self, moment: datetime) -> date:
+        return moment.astimezone(pytz.timezone(self.timezone)).date()
+
+
+# Subscriptions grouped into delivery buckets
+def group_by_bucket(subscriptions: List[Subscription]) -> Dict[DeliveryBucket, List[Subscription]]:
+    buckets: Dict[DeliveryBucket, List[Subscription]] = {}
+    for subscription in subscriptions:
+        buckets.setdefault(DeliveryBucket.of(subscription), []).append(subscription)
+    return buckets
+
+
+# How long a bucket of `chats` is spread over: long enough to stay under the
+# send rate, never longer than `max_window` seconds
+def jitter_window(chats: int, max_window: float) -> float:
+    return min(max_window, chats / CHATS_PER_SECOND)
+
+
+# A stable offset in [0, window) for `key`: the same chat or sheet starts at the
+# same point of the window every day, and keys spread evenly across it
+def jitter(key: str, window: float) -> float:
+    if window <= 0:
+        return 0.0
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64 * window
@@ -1,26 +1,177 @@
-from telegram import Update
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.error import BadRequest
 from telegram.ext import CallbackContext
-from sheets.roadmap import update_task_status
+from bot.callback_data import LEGACY_DONE_PREFIX, parse_done, resolve_done
+from bot.send_queue import get_send_queue
+from bot.status_writer import get_status_writer
+from bot.subscriptions import get_registry
+from config.settings import get_settings
+from metrics.instruments import CALLBACK_ANSWER_LATENCY, CALLBACK_LATENCY
+from sheets.aggregate import AggregateSnapshot
+from sheets.async_roadmap import load_snapshot_async
 
-# Handle inline button presses
-async def handle_button(update: Update, context: CallbackContext):
+# Constants
+DONE_CALLBACK = "noop"  # pressing a ticked button does nothing
+MAX_TRACKED_KEYBOARDS = 1000  # messages whose keyboard we remember between presses
+
+# Edit the message the button belongs to, through the send queue
+async def edit_reply(update: Update, context: CallbackContext, text: str):
     query = update.callback_query
-    await query.answer()
+    if query.message is None:
+        # Inline-mode message: there is no chat to queue under
+        await query.edit_message_text(text)
+        return
+    await get_send_queue(context.application).edit_message_text(
+        query.message.chat_id, query.message.message_id, text
+    )
 
-    data = query.data
-    if not data.startswith("done|"):
-        await query.edit_message_text("Unknown action.")
+
+# Tell the user about a press that could not be carried out, once the press
+# itself has been answered: a new message in the chat, or the inline message edited
+async def notify(update: Update, context: CallbackContext, text: str):
+    query = update.callback_query
+    if query.message is None:
+        await edit_reply(update, context, text)
         return
+    await get_send_queue(context.application).send_message(query.message.chat_id, text)
+
+
+# The keyboard as we last set it: presses that arrive close together carry the
+# markup from before each other's edits, so the message's own copy can be stale
+def current_keyboard(update: Update, context: CallbackContext) -> Optional[InlineKeyboardMarkup]:
+    message = update.callback_query.message
+    if message is None:
+        return None
+    keyboards = context.application.bot_data.setdefault("keyboards", OrderedDict())
+    return keyboards.get((message.chat_id, message.message_id), message.reply_markup)
+
+
+# Swap the button with `callback_data` for `button`; returns the one replaced
+async def replace_button(update: Update, context: CallbackContext, callback_data: str,
+                         button: InlineKeyboardButton, position: Optional[Tuple[int, int]] = None
+                         ) -> Optional[Tuple[Tuple[int, int], InlineKeyboardButton]]:
+    query = update.callback_query
+    markup = current_keyboard(update, context)
+    if markup is None:
+        return None
+
+    rows = [list(row) for row in markup.inline_keyboard]
+    if position is None:
+        position = next(((i, j) for i, row in enumerate(rows) for j, b in enumerate(row)
+                         if b.callback_data == callback_data), None)
+    if position is None or position[0] >= len(rows) or position[1] >= len(rows[position[0]]):
+        return None  # already replaced by an earlier press
+
+    i, j = position
+    replaced, rows[i][j] = rows[i][j], button
+    markup = InlineKeyboardMarkup(rows)
+
+    keyboards = context.application.bot_data["keyboards"]
+    keyboards[(query.message.chat_id, query.message.message_id)] = markup
+    keyboards.move_to_end((query.message.chat_id, query.message.message_id))
+    while len(keyboards) > MAX_TRACKED_KEYBOARDS:
+        keyboards.popitem(last=False)
 
-    _, key = data.split("|", 1)
     try:
-        start_date, topic = key.split("::", 1)
-    except ValueError:
-        await query.edit_message_text("Invalid key format.")
-        return
+        await get_send_queue(context.application).edit_message_reply_markup(
+            query.message.chat_id, query.message.message_id, reply_markup=markup
+        )
+    except BadRequest as e:
+        logging.warning(f"Could not update the keyboard: {e}")
+    return position, replaced
+
 
-    success = update_task_status(start_date, topic, "Done")
+# Handle inline button presses, timing each one by what it turned out to be
+async def handle_button(update: Update, context: CallbackContext):
+    started = time.perf_counter()
+    action = "error"
+    try:
+        action = await _handle_button(update, context, started)
+    finally:
+        CALLBACK_LATENCY.observe(time.perf_counter() - started, action=action)
+
+
+# Acknowledge the press, recording how long the user waited for it
+async def _answer(query, started: float, text: Optional[str] = None):
+    await query.answer(text)
+    CALLBACK_ANSWER_LATENCY.observe(time.perf_counter() - started)
+
+
+# Returns the action taken, for metrics
+async def _handle_button(update: Update, context: CallbackContext, started: float) -> str:
+    query = update.callback_query
+
+    data = query.data
+    if data == DONE_CALLBACK:
+        await _answer(query, started, "Already marked as done")
+        return "noop"
+
+    # Only allowed chats may write to the roadmap
+    if not get_settings().allows_chat(query.message.chat_id if query.message is not None else None):
+        await _answer(query, started, "⛔ This bot is private.")
+        return "refused"
+
+    sheet = (None, get_settings().roadmap_sheets)
+    if query.message is not None:
+        subscription = get_registry().get(str(query.message.chat_id))
+        if subscription is not None:
+            sheet = (subscription.spreadsheet_id, subscription.worksheet)
+
+    compact = parse_done(data)
+    row = None  # legacy buttons carry only the task key
+    if compact is not None:
+        # Acknowledge before reading the roadmap: a cold cache can take a while
+        await _answer(query, started)
+        try:
+            # The row points straight at the task; no key parsing or lookup
+            snapshot = await load_snapshot_async(sheet[1], sheet[0])
+            task = resolve_done(snapshot, *compact)
+        except Exception as e:
+            logging.error(f"Error loading the roadmap for a button press: {e}")
+            await notify(update, context, "⚠️ Could not update the task. Please try again.")
+            return "load_failed"
+        if task is None:
+            await notify(update, context, "This task is no longer in the roadmap.")
+            return "gone"
+        start_date, topic, row = task["Start Date"], task["Topic"], task.row
+        if isinstance(snapshot, AggregateSnapshot):
+            # Write to the sheet and row the task came from
+            sheet, row = snapshot.origin(task.row)
+    elif data.startswith(LEGACY_DONE_PREFIX):
+        key = data[len(LEGACY_DONE_PREFIX):]
+        try:
+            start_date, topic = key.split("::", 1)
+        except ValueError:
+            await _answer(query, started)
+            await edit_reply(update, context, "Invalid key format.")
+            return "invalid"
+    else:
+        await _answer(query, started)
+        await edit_reply(update, context, "Unknown action.")
+        return "unknown"
+
+    # Optimistic UI: acknowledge and tick the button before the sheet is written
+    if compact is None:
+        await _answer(query, started, f"✅ Marked '{topic}' as done!"[:200])
+    ticked = await replace_button(
+        update, context, data, InlineKeyboardButton(text=f"☑️ Done: {topic}", callback_data=DONE_CALLBACK)
+    )
+
+    # Presses close together share one batched write; double taps share one change
+    success = await get_status_writer(context.application).submit(start_date, topic, "Done", sheet, row)
     if success:
-        await query.edit_message_text(f"✅ Marked '{topic}' as done!")
+        return "done"
+
+    # The write failed: put the button back and say so
+    if ticked is not None:
+        position, original = ticked
+        await replace_button(update, context, DONE_CALLBACK, original, position)
+    if query.message is None:
+        await edit_reply(update, context, "⚠️ Could not update the task. Please try again.")
     else:
-        await query.edit_message_text("⚠️ Could not update the task. Please try again.")
+        await notify(update, context, f"⚠️ Could not mark '{topic}' as done. Please try again.")
+    return "write_failed"
@@ -0,0 +1,113 @@
+# Which scheduled runs of each job have happened, persisted as JSON
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime, time, timedelta, timezone
+from typing import Dict, List, Optional
+
+
+@dataclass
+class JobRun:
+    scheduled: str  # ISO time of the occurrence, UTC
+    started_at: str
+    finished_at: Optional[str] = None
+
+
+class JobRunLog:
+    """Latest claimed occurrence of each scheduled job, saved on every change.
+
+    A run claims its occurrence before doing anything, and an occurrence at
+    or before the last claim is never run again. So a job is run at most once
+    per occurrence, whether the scheduler fired it or the catch-up pass
+    picked it up. A run that crashed partway is not repeated, because chats
+    it already reached would get the summary twice. The file is re-read
+    before every claim, so replicas sharing it see each other's runs.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._runs: Dict[str, JobRun] = {}
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                self._runs = {job: JobRun(**run) for job, run in json.load(f).items()}
+        except Exception as e:
+            print(f"Error reading job runs from {self.path}: {str(e)}")
+
+    # Write to a temp file and swap it in so a crash never leaves half a file
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({job: asdict(run) for job, run in self._runs.items()}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def last(self, job: str) -> Optional[JobRun]:
+        with self._lock:
+            self._load()
+            return self._runs.get(job)
+
+    # Claim an occurrence; False if it (or a later one) was already claimed
+    def claim(self, job: str, scheduled: datetime) -> bool:
+        with self._lock:
+            self._load()
+            current = self._runs.get(job)
+            if current is not None and datetime.fromisoformat(current.scheduled) >= scheduled:
+                return False
+            self._runs[job] = JobRun(scheduled.astimezone(timezone.utc).isoformat(), _now())
+            self._save()
+            return True
+
+    def finish(self, job: str, scheduled: datetime):
+        with self._lock:
+            current = self._runs.get(job)
+            if current is not None and datetime.fromisoformat(current.scheduled) == scheduled:
+                current.finished_at = _now()
+                self._save()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# Occurrences of a daily job at `at` (aware) after `since` and up to `now`, oldest first.
+# A pytz zone must be applied with localize(), or it gets the zone's historical LMT offset
+def daily_occurrences(at: time, since: datetime, now: datetime) -> List[datetime]:
+    day = since.astimezone(at.tzinfo).date()
+    localize = getattr(at.tzinfo, "localize", None)
+    occurrences = []
+    while True:
+        if localize is not None:
+            occurrence = localize(datetime.combine(day, at.replace(tzinfo=None)))
+        else:
+            occurrence = datetime.combine(day, at)
+        if occurrence > now:
+            return occurrences
+        if occurrence > since:
+            occurrences.append(occurrence)
+        day += timedelta(days=1)
+
+
+# The latest occurrence of a daily job at `at` up to `now`. Two days back:
+# across a DST change the previous occurrence can be more than 24h ago
+def last_daily_occurrence(at: time, now: datetime) -> datetime:
+    return daily_occurrences(at, now - timedelta(days=2), now)[-1]
+
+
+_log: Optional[JobRunLog] = None
+
+
+# Get the shared job-run log, stored at JOB_RUNS_PATH
+def get_job_run_log() -> JobRunLog:
+    global _log
+    if _log is None:
+        from config.settings import JOB_RUNS_PATH
+        _log = JobRunLog(JOB_RUNS_PATH)
+    return _log
@@ -0,0 +1,217 @@
+# Leader election so that only one replica runs the scheduled jobs
+import asyncio
+import functools
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Optional, Tuple
+from telegram.ext import Application, CallbackContext
+
+# Constants
+LEASE_NAME = "scheduler"
+LEASE_TTL = 30  # seconds a lease lasts without renewal; a dead leader is replaced within about this long
+RENEW_FRACTION = 3  # renew this many times per TTL
+SAFETY_MARGIN = 0.2  # fraction of the TTL a leader gives up early, so two replicas never both think they lead
+
+
+class LeaseBackend(ABC):
+    """Named leases shared by every replica: one holder at a time, until it expires.
+
+    ``acquire()`` takes a free or expired lease, or extends one the holder
+    already has, and returns whether the caller holds it afterwards. Expiry
+    times are wall-clock seconds, so replicas must share a clock (same host,
+    or NTP-synced hosts on a shared volume).
+    """
+
+    @abstractmethod
+    def acquire(self, name: str, holder: str, ttl: float) -> bool:
+        ...
+
+    @abstractmethod
+    def release(self, name: str, holder: str):
+        ...
+
+    # (holder, expires at) of a live lease, or None
+    @abstractmethod
+    def current(self, name: str) -> Optional[Tuple[str, float]]:
+        ...
+
+
+class FileLeaseBackend(LeaseBackend):
+    """One JSON file per lease, updated under an exclusive flock (POSIX only)."""
+
+    def __init__(self, directory: str):
+        import fcntl  # not available on Windows; use the SQLite backend there
+        self._fcntl = fcntl
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.lease")
+
+    # Run `update(current lease)` with the file locked; it returns the lease to
+    # write (None removes it) and the result to hand back
+    def _locked(self, name: str, update):
+        with open(self._path(name), "a+") as f:
+            self._fcntl.flock(f, self._fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                content = f.read()
+                lease = tuple(json.loads(content)) if content else None
+                new_lease, result = update(lease)
+                if new_lease != lease:
+                    f.seek(0)
+                    f.truncate()
+                    if new_lease is not None:
+                        f.write(json.dumps(list(new_lease)))
+                    f.flush()
+                    os.fsync(f.fileno())
+                return result
+            finally:
+                self._fcntl.flock(f, self._fcntl.LOCK_UN)
+
+    def acquire(self, name: str, holder: str, ttl: float) -> bool:
+        now = time.time()
+
+        def update(lease):
+            if lease is not None and lease[0] != holder and lease[1] > now:
+                return lease, False
+            return (holder, now + ttl), True
+
+        return self._locked(name, update)
+
+    def release(self, name: str, holder: str):
+        self._locked(name, lambda lease: (None if lease and lease[0] == holder else lease, None))
+
+    def current(self, name: str) -> Optional[Tuple[str, float]]:
+        now = time.time()
+        return self._locked(name, lambda lease: (lease, lease if lease and lease[1] > now else None))
+
+
+class SqliteLeaseBackend(LeaseBackend):
+    """Leases as rows of a SQLite table, taken with a single conditional upsert."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=LEASE_TTL / RENEW_FRACTION,
+                                     isolation_level=None)  # autocommit: every statement is its own transaction
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def acquire(self, name: str, holder: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at "
+                "WHERE leases.holder = excluded.holder OR leases.expires_at <= ?",
+                (name, holder, now + ttl, now),
+            )
+            return cursor.rowcount == 1
+
+    def release(self, name: str, holder: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder))
+
+    def current(self, name: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT holder, expires_at FROM leases WHERE name = ? AND expires_at > ?", (name, time.time())
+            ).fetchone()
+        return tuple(row) if row else None
+
+
+class LeaderElector:
+    """Holds (or waits for) the scheduler lease on behalf of this replica.
+
+    Every replica calls ``renew()`` every ``ttl / 3`` seconds: the leader
+    extends its lease and the others try to take it, so when the leader
+    dies another replica leads within ``ttl`` plus one renew interval. A
+    leader stops considering itself leader ``SAFETY_MARGIN`` of the TTL
+    before its lease runs out, so a replica that missed its renewals (paused,
+    partitioned) steps down before anyone else can take over.
+    """
+
+    def __init__(self, backend: LeaseBackend, name: str = LEASE_NAME, holder: Optional[str] = None,
+                 ttl: float = LEASE_TTL):
+        self.backend = backend
+        self.name = name
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.ttl = ttl
+        self.renew_interval = ttl / RENEW_FRACTION
+        self._valid_until = 0.0  # monotonic time our lease stops counting
+
+    @property
+    def is_leader(self) -> bool:
+        return time.monotonic() < self._valid_until
+
+    # Take or extend the lease; returns whether this replica leads
+    async def renew(self) -> bool:
+        was_leader = self.is_leader
+        started = time.monotonic()
+        try:
+            held = await asyncio.to_thread(self.backend.acquire, self.name, self.holder, self.ttl)
+        except Exception as e:
+            logging.error(f"Could not renew the {self.name} lease: {e}")
+            held = False
+        self._valid_until = started + self.ttl * (1 - SAFETY_MARGIN) if held else 0.0
+
+        if held and not was_leader:
+            logging.info(f"{self.holder} is now the {self.name} leader")
+        elif was_leader and not held:
+            logging.warning(f"{self.holder} lost the {self.name} lease")
+        return held
+
+    async def release(self):
+        if self._valid_until:
+            self._valid_until = 0.0
+            await asyncio.to_thread(self.backend.release, self.name, self.holder)
+            logging.info(f"{self.holder} released the {self.name} lease")
+
+    # Holder of the lease as the backend sees it
+    async def leader(self) -> Optional[str]:
+        lease = await asyncio.to_thread(self.backend.current, self.name)
+        return lease[0] if lease else None
+
+
+# Build the elector configured in settings, or None for a single replica
+def create_leader_elector() -> Optional[LeaderElector]:
+    from config.settings import LEADER_LEASE_BACKEND, LEADER_LEASE_PATH, LEADER_LEASE_TTL
+    if LEADER_LEASE_BACKEND == "file":
+        backend = FileLeaseBackend(LEADER_LEASE_PATH)
+    elif LEADER_LEASE_BACKEND == "sqlite":
+        backend = SqliteLeaseBackend(LEADER_LEASE_PATH)
+    else:
+        return None
+    return LeaderElector(backend, ttl=LEADER_LEASE_TTL)
+
+
+# The application's elector (None when leader election is off)
+def get_leader_elector(bot_app: Application) -> Optional[LeaderElector]:
+    return bot_app.bot_data.get("leader")
+
+
+# Wrap a job callback so it only runs on the leader; the lease is confirmed
+# right before the run, and a non-leader skips it
+def leader_only(callback: Callable[[CallbackContext], Awaitable[None]]) -> Callable[[CallbackContext], Awaitable[None]]:
+    @functools.wraps(callback)
+    async def run(context: CallbackContext):
+        elector = get_leader_elector(context.application)
+        if elector is not None and not await elector.renew():
+            logging.info(f"Skipping {context.job.name if context.job else callback.__name__}: "
+                         f"{await elector.leader() or 'another replica'} leads")
+            return
+        await callback(context)
+    return run
@@ -0,0 +1,67 @@
+# Token buckets that keep outgoing messages under Telegram's limits
+import asyncio
+import time
+from typing import Dict
+
+# Telegram allows about 30 messages per second overall, one per second in a
+# private chat and 20 per minute in a group
+GLOBAL_RATE = 30
+PRIVATE_CHAT_RATE = 1
+GROUP_CHAT_RATE = 20 / 60
+
+
+class TokenBucket:
+    """Allows ``rate`` acquisitions per second with bursts of up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # Seconds until a token is available (0 if one is available now)
+    def wait_time(self) -> float:
+        self._refill()
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        while True:
+            wait = self.wait_time()
+            if wait == 0:
+                self.tokens -= 1
+                return
+            await asyncio.sleep(wait)
+
+
+class RateLimiter:
+    """A global bucket plus one bucket per chat; a send waits for both."""
+
+    def __init__(self, global_rate: float = GLOBAL_RATE, private_chat_rate: float = PRIVATE_CHAT_RATE,
+                 group_chat_rate: float = GROUP_CHAT_RATE):
+        self.global_bucket = TokenBucket(global_rate, capacity=global_rate)
+        self.private_chat_rate = private_chat_rate
+        self.group_chat_rate = group_chat_rate
+        self.chat_buckets: Dict[str, TokenBucket] = {}
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        chat_id = str(chat_id)
+        if chat_id not in self.chat_buckets:
+            # Group and channel ids are negative
+            rate = self.group_chat_rate if chat_id.startswith("-") else self.private_chat_rate
+            self.chat_buckets[chat_id] = TokenBucket(rate)
+        return self.chat_buckets[chat_id]
+
+    async def acquire(self, chat_id: str):
+        await self._chat_bucket(chat_id).acquire()
+        await self.global_bucket.acquire()
+
+    # Drop buckets that have refilled completely; they hold no state worth keeping
+    def prune(self):
+        for chat_id, bucket in list(self.chat_buckets.items()):
+            if bucket.wait_time() == 0 and bucket.tokens >= bucket.capacity:
+                del self.chat_buckets[chat_id]
@@ -0,0 +1,73 @@
+# Rendered daily summaries, shared by every chat that gets the same content
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from telegram import InlineKeyboardMarkup
+from sheets.task import Task
+
+# Constants
+TEMPLATE = "en-1"  # bump when format_task or summary_blocks change the summary text
+MAX_ENTRIES = 512  # rendered summaries kept (least recently used go first)
+
+Payload = List[Tuple[str, Optional[InlineKeyboardMarkup]]]  # (message text, keyboard) per message
+
+
+# Revision of what a summary shows: the header, the rows and their cells,
+# except Status, which is never rendered. Any other edit to a listed task changes it.
+def content_revision(tasks: List[Task], deadlines: List[Task]) -> str:
+    def rendered(task: Task):
+        status_col = task.schema.status_col
+        return [task.row] + [cell for i, cell in enumerate(task.cells) if i != status_col]
+
+    header = (tasks or deadlines)[0].schema.header if tasks or deadlines else []
+    content = json.dumps([header, [rendered(t) for t in tasks], [rendered(d) for d in deadlines]])
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+
+class RenderCache:
+    """Final message chunks and keyboards keyed by (template, content revision).
+
+    Chats that read the same sheet on the same day get identical summaries, so
+    the first render is reused for all of them; the daily job fills the cache
+    shortly before the send. The key is derived from the tasks' content, so a
+    sheet edit to a listed task makes the old entry unreachable.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Payload]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, tasks: List[Task], deadlines: List[Task], render: Callable[[], Payload],
+            template: str = TEMPLATE) -> Payload:
+        key = (template, content_revision(tasks, deadlines))
+        payload = self._entries.get(key)
+        if payload is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return payload
+
+        self.misses += 1
+        payload = render()
+        self._entries[key] = payload
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return payload
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+_cache: Optional[RenderCache] = None
+
+
+def get_render_cache() -> RenderCache:
+    global _cache
+    if _cache is None:
+        _cache = RenderCache()
+    return _cache
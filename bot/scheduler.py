@@ -0,0 +1,332 @@
+# Daily summary fan-out to every subscribed chat
+import asyncio
+import logging
+import time
+from datetime import date, datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from telegram.error import Forbidden
+from telegram.ext import Application
+from bot.delivery import PRECOMPUTE_LEAD, DeliveryBucket, group_by_bucket, jitter, jitter_window
+from bot.job_runs import get_job_run_log
+from bot.render_cache import get_render_cache
+from bot.send_queue import SendQueue, get_send_queue
+from bot.sender import (
+    deliver_payload,
+    deliver_summary,
+    local_time,
+    prepare_daily_tasks,
+    render_catch_up,
+    render_summary,
+)
+from bot.subscriptions import Subscription, SubscriptionRegistry, get_registry
+from metrics.spans import span, trace
+from sheets.async_roadmap import load_snapshot_async, sync_store_async, write_statuses_async
+from sheets.index import DATE_FORMAT, parse_date
+from sheets.roadmap import RoadmapSnapshot, get_roadmap_cache
+from sheets.task import Task
+
+# Constants
+SHEET_CONCURRENCY = 4  # sheets fetched and updated at once
+SEND_CONCURRENCY = 200  # summaries handed to the send queue at once (the queue applies rate limits)
+FANOUT_TIME_BUDGET = 10 * 60  # seconds; chats not reached by then are skipped until the next run
+MAX_CATCH_UP_DAYS = 7  # missed days a catch-up message lists; older ones are only counted
+
+
+class FanoutRun:
+    """State shared by one fan-out: send queue, deadline and per-run counters.
+
+    ``at`` is the moment the run is for (its scheduled time); each chat's
+    "today" is its local date at that moment. Sheet loads and sends start at
+    stable jittered offsets spread over ``window`` seconds. A run for one
+    ``bucket`` marks missed tasks by that bucket's own day.
+    """
+
+    def __init__(self, queue: SendQueue, registry: SubscriptionRegistry, at: Optional[datetime] = None,
+                 window: float = 0, bucket: Optional[DeliveryBucket] = None):
+        self.queue = queue
+        self.registry = registry
+        self.at = at or datetime.now(timezone.utc)
+        self.bucket = bucket
+        self.window = window
+        self.started = time.monotonic()
+        self.deadline = self.started + FANOUT_TIME_BUDGET
+        self.sheet_semaphore = asyncio.Semaphore(SHEET_CONCURRENCY)
+        self.send_semaphore = asyncio.Semaphore(SEND_CONCURRENCY)
+        self.stats = {"sheets": 0, "sent": 0, "failed": 0, "skipped": 0, "unsubscribed": 0}
+
+    # The day missed marking counts from at `moment`: the bucket's day in its
+    # own zone, or the earliest local day among the chats of a run for everyone
+    def earliest_today(self, now_by_chat: Dict[str, datetime], moment: datetime) -> date:
+        if self.bucket is not None:
+            return self.bucket.today(moment)
+        return min(now.date() for now in now_by_chat.values())
+
+    # Wait until `key`'s (a chat's or a sheet's) offset in the window
+    async def wait_turn(self, key: str):
+        delay = self.started + jitter(key, self.window) - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    # Fetch and update one sheet, then send to all of its subscribers
+    async def run_sheet(self, sheet: Tuple[str, str], subscriptions: List[Subscription]):
+        spreadsheet_id, worksheet = sheet
+        await self.wait_turn(f"{spreadsheet_id}/{worksheet}")
+        with span("sheet", worksheet=worksheet, chats=len(subscriptions)):
+            try:
+                async with self.sheet_semaphore:
+                    with span("load"):
+                        snapshot = await load_snapshot_async(worksheet, spreadsheet_id)
+
+                    # "Today" depends on each chat's time zone; missed marking uses earliest_today()
+                    now_by_chat = {s.chat_id: local_time(self.at, s.timezone) for s in subscriptions}
+                    day_by_chat = {chat_id: now.strftime("%d-%m-%Y") for chat_id, now in now_by_chat.items()}
+                    with span("prepare"):
+                        by_day = await prepare_daily_tasks(snapshot, self.earliest_today(now_by_chat, self.at),
+                                                           set(day_by_chat.values()))
+                    self.stats["sheets"] += 1
+            except Exception as e:
+                logging.error(f"Error preparing summary for sheet {worksheet} in {spreadsheet_id}: {e}")
+                self.stats["failed"] += len(subscriptions)
+                return
+
+            await asyncio.gather(*[
+                self.send(s.chat_id, *by_day[day_by_chat[s.chat_id]]) for s in subscriptions
+            ])
+
+    # Catch-up for one sheet: one read, one status write, one message per chat
+    # covering every missed day in that chat's time zone
+    async def run_catch_up_sheet(self, sheet: Tuple[str, str], subscriptions: List[Subscription],
+                                 missed: List[datetime], total_missed: int):
+        spreadsheet_id, worksheet = sheet
+        with span("sheet", worksheet=worksheet, chats=len(subscriptions)):
+            try:
+                async with self.sheet_semaphore:
+                    with span("load"):
+                        snapshot = await load_snapshot_async(worksheet, spreadsheet_id)
+
+                    now = datetime.now(timezone.utc)
+                    now_by_chat = {s.chat_id: local_time(now, s.timezone) for s in subscriptions}
+                    days_by_chat = {
+                        s.chat_id: sorted({local_time(m, s.timezone).strftime(DATE_FORMAT) for m in missed},
+                                          key=parse_date)
+                        for s in subscriptions
+                    }
+                    by_day = {day: (snapshot.today_tasks(day), snapshot.today_deadlines(day))
+                              for days in days_by_chat.values() for day in days}
+                    today = {now.strftime(DATE_FORMAT) for now in now_by_chat.values()}
+                    with span("statuses"):
+                        changes = catch_up_statuses(snapshot, self.earliest_today(now_by_chat, now), by_day, today)
+                        await write_statuses_async(snapshot, changes)
+                    self.stats["sheets"] += 1
+            except Exception as e:
+                logging.error(f"Error preparing catch-up for sheet {worksheet} in {spreadsheet_id}: {e}")
+                self.stats["failed"] += len(subscriptions)
+                return
+
+            def send_catch_up(chat_id: str) -> Callable[[], Awaitable[None]]:
+                payload = render_catch_up([(day, *by_day[day]) for day in days_by_chat[chat_id]], total_missed)
+                return lambda: deliver_payload(self.queue, chat_id, payload)
+
+            await asyncio.gather(*[self.deliver(s.chat_id, send_catch_up(s.chat_id)) for s in subscriptions])
+
+    async def send(self, chat_id: str, tasks: List[Task], deadlines: List[Task]):
+        await self.deliver(chat_id, lambda: deliver_summary(self.queue, chat_id, tasks, deadlines))
+
+    async def deliver(self, chat_id: str, send: Callable[[], Awaitable[None]]):
+        await self.wait_turn(chat_id)
+        if time.monotonic() > self.deadline:
+            self.stats["skipped"] += 1
+            return
+
+        async with self.send_semaphore:
+            try:
+                with span("deliver"):
+                    await send()
+                self.stats["sent"] += 1
+            except Forbidden:
+                # The user blocked the bot or left the chat
+                self.registry.unsubscribe(chat_id)
+                self.stats["unsubscribed"] += 1
+            except Exception as e:
+                logging.error(f"Error sending summary to {chat_id}: {e}")
+                self.stats["failed"] += 1
+
+
+# Send the daily summary to every subscriber (or a delivery bucket's), fetching
+# each sheet once; `at` is the scheduled time the summary is for
+async def send_daily_fanout(bot_app: Application, registry: Optional[SubscriptionRegistry] = None,
+                            bucket: Optional[DeliveryBucket] = None, at: Optional[datetime] = None) -> Dict[str, int]:
+    from config.settings import DELIVERY_JITTER
+    registry = registry or get_registry()
+    subscriptions = registry.all()
+    if bucket is not None:
+        subscriptions = [s for s in subscriptions if DeliveryBucket.of(s) == bucket]
+    queue = get_send_queue(bot_app)
+    run = FanoutRun(queue, registry, at, jitter_window(len(subscriptions), DELIVERY_JITTER), bucket)
+    started = time.monotonic()
+
+    groups = registry.group_by_sheet(subscriptions)
+    with trace("daily_fanout", sheets=len(groups), chats=len(subscriptions),
+               bucket=bucket.key if bucket else "all") as timing:
+        await asyncio.gather(*[run.run_sheet(sheet, subscriptions) for sheet, subscriptions in groups.items()])
+
+    queue.limiter.prune()
+    logging.info(f"Daily fan-out finished in {time.monotonic() - started:.1f}s: {run.stats}")
+    logging.info(f"Send queue: {queue.stats()}, render cache: {get_render_cache().stats()}")
+    logging.info(timing.format_summary())
+    if run.stats["skipped"]:
+        logging.warning(f"{run.stats['skipped']} chats skipped: fan-out exceeded {FANOUT_TIME_BUDGET}s")
+    return run.stats
+
+
+# {sheet row: status} for a catch-up in one batch: Pending tasks from before
+# today become Missed as in a daily run, tasks of missed past days go straight
+# to Missed, and today's tasks to Pending. Done tasks are left alone
+def catch_up_statuses(snapshot: RoadmapSnapshot, earliest_today: date,
+                      by_day: Dict[str, Tuple[List[Task], List[Task]]], today: Set[str]) -> Dict[int, str]:
+    if snapshot.status_col is None:
+        print(f"Error: 'Status' column not found in spreadsheet")
+        return {}
+
+    return snapshot.status_changes(
+        earliest_today,
+        pending_days=[parse_date(day) for day in by_day if day in today],
+        missed_days=[parse_date(day) for day in by_day if day not in today],
+    )
+
+
+# A bucket's scheduled daily run: claims its occurrence in the job-run log
+# first, so an occurrence the catch-up pass already sent is not sent again
+async def run_daily_summary(bot_app: Application, bucket: DeliveryBucket, scheduled: Optional[datetime] = None,
+                            registry: Optional[SubscriptionRegistry] = None) -> Optional[Dict[str, int]]:
+    scheduled = scheduled or bucket.last_occurrence(datetime.now(timezone.utc))
+    log = get_job_run_log()
+    if not log.claim(bucket.job_name, scheduled):
+        logging.info(f"Daily summary {bucket.key} for {scheduled.isoformat()} already ran; skipping")
+        return None
+
+    stats = await send_daily_fanout(bot_app, registry, bucket, scheduled)
+    log.finish(bucket.job_name, scheduled)
+    return stats
+
+
+# Send one consolidated summary for every daily run missed since the last
+# recorded one (process down at delivery time), bucket by bucket. Returns
+# None when nothing was missed
+async def catch_up_daily_summary(bot_app: Application,
+                                 registry: Optional[SubscriptionRegistry] = None) -> Optional[Dict[str, int]]:
+    registry = registry or get_registry()
+    totals: Optional[Dict[str, int]] = None
+    for bucket, subscriptions in group_by_bucket(registry.all()).items():
+        stats = await catch_up_bucket(bot_app, registry, bucket, subscriptions)
+        if stats is not None:
+            totals = {name: (totals or {}).get(name, 0) + value for name, value in stats.items()}
+    return totals
+
+
+async def catch_up_bucket(bot_app: Application, registry: SubscriptionRegistry, bucket: DeliveryBucket,
+                          subscriptions: List[Subscription]) -> Optional[Dict[str, int]]:
+    log = get_job_run_log()
+    now = datetime.now(timezone.utc)
+
+    last = log.last(bucket.job_name)
+    if last is None:
+        # No history yet (first start, new bucket): count from here rather than replaying the past
+        record_baseline(bucket, now)
+        return None
+    if last.finished_at is None:
+        logging.warning(f"The daily summary {bucket.key} for {last.scheduled} did not finish; it is not repeated")
+
+    missed = bucket.occurrences(datetime.fromisoformat(last.scheduled), now)
+    if not missed or not log.claim(bucket.job_name, missed[-1]):
+        return None
+
+    logging.warning(f"Missed {len(missed)} daily summaries {bucket.key} since {last.scheduled}; sending one catch-up")
+    queue = get_send_queue(bot_app)
+    run = FanoutRun(queue, registry, bucket=bucket)
+    groups = registry.group_by_sheet(subscriptions)
+    with trace("catch_up", missed=len(missed), bucket=bucket.key) as timing:
+        await asyncio.gather(*[
+            run.run_catch_up_sheet(sheet, sheet_subscriptions, missed[-MAX_CATCH_UP_DAYS:], len(missed))
+            for sheet, sheet_subscriptions in groups.items()
+        ])
+
+    log.finish(bucket.job_name, missed[-1])
+    logging.info(f"Catch-up {bucket.key} finished: {run.stats}")
+    logging.info(timing.format_summary())
+    return run.stats
+
+
+# Mark a bucket's latest occurrence as done, so a bucket that just appeared
+# (or has no history) starts with its next delivery instead of a catch-up
+def record_baseline(bucket: DeliveryBucket, now: Optional[datetime] = None):
+    log = get_job_run_log()
+    baseline = bucket.last_occurrence(now or datetime.now(timezone.utc))
+    if log.claim(bucket.job_name, baseline):
+        log.finish(bucket.job_name, baseline)
+
+
+# Render the summaries a send at `at` (default: PRECOMPUTE_LEAD from now) will
+# need, for every subscribed sheet or one bucket's, so the fan-out mostly
+# sends payloads that are already built
+async def precompute_daily_summaries(registry: Optional[SubscriptionRegistry] = None,
+                                     bucket: Optional[DeliveryBucket] = None,
+                                     at: Optional[datetime] = None) -> Dict[str, int]:
+    registry = registry or get_registry()
+    at = at or datetime.now(timezone.utc) + PRECOMPUTE_LEAD
+    subscriptions = registry.all()
+    if bucket is not None:
+        subscriptions = [s for s in subscriptions if DeliveryBucket.of(s) == bucket]
+    semaphore = asyncio.Semaphore(SHEET_CONCURRENCY)
+    stats = {"sheets": 0, "summaries": 0, "failed": 0}
+
+    async def render_sheet(sheet: Tuple[str, str], subscriptions: List[Subscription]):
+        spreadsheet_id, worksheet = sheet
+        try:
+            async with semaphore:
+                snapshot = await load_snapshot_async(worksheet, spreadsheet_id)
+        except Exception as e:
+            logging.error(f"Error loading sheet {worksheet} in {spreadsheet_id} for precompute: {e}")
+            stats["failed"] += 1
+            return
+
+        stats["sheets"] += 1
+        for day in {local_time(at, s.timezone).strftime(DATE_FORMAT) for s in subscriptions}:
+            tasks, deadlines = snapshot.today_tasks(day), snapshot.today_deadlines(day)
+            if tasks or deadlines:
+                render_summary(tasks, deadlines)
+                stats["summaries"] += 1
+
+    groups = registry.group_by_sheet(subscriptions)
+    with trace("precompute_summaries"):
+        await asyncio.gather(*[render_sheet(sheet, subs) for sheet, subs in groups.items()])
+    logging.info(f"Precomputed summaries: {stats}, render cache: {get_render_cache().stats()}")
+    return stats
+
+
+# Replay queued status changes and refresh the local task store for every sheet in use
+async def sync_task_store(registry: Optional[SubscriptionRegistry] = None) -> Dict[str, int]:
+    registry = registry or get_registry()
+    store = get_roadmap_cache().store
+    if store is None:
+        return {}
+
+    sheets = set(registry.group_by_sheet()) | set(store.sheets())
+    semaphore = asyncio.Semaphore(SHEET_CONCURRENCY)
+    stats = {"sheets": 0, "written": 0, "failed": 0}
+
+    async def sync(sheet: Tuple[str, str]):
+        spreadsheet_id, worksheet = sheet
+        async with semaphore:
+            try:
+                stats["written"] += await sync_store_async(worksheet, spreadsheet_id)
+                stats["sheets"] += 1
+            except Exception as e:
+                # The store keeps answering from its last copy; the outbox waits for the next run
+                logging.error(f"Error syncing task store with sheet {worksheet} in {spreadsheet_id}: {e}")
+                stats["failed"] += 1
+
+    await asyncio.gather(*[sync(sheet) for sheet in sheets])
+    if stats["written"] or stats["failed"]:
+        logging.info(f"Task store sync: {stats}, {store.stats()}")
+    return stats
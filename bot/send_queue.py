@@ -0,0 +1,153 @@
+# Outbound Telegram message queue
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+from telegram import Bot
+from telegram.error import BadRequest, NetworkError, RetryAfter
+from telegram.ext import Application
+from bot.ratelimit import RateLimiter
+from metrics.instruments import TELEGRAM_BACKOFF, TELEGRAM_RETRIES, telegram_call
+
+# Constants
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 1  # seconds; doubled on every retry and jittered
+MAX_IN_FLIGHT = 50  # Bot API requests running at once
+LATENCY_SAMPLES = 1000  # recent enqueue-to-done latencies kept for stats()
+
+
+class SendQueue:
+    """Every outgoing Bot API call goes through here.
+
+    Calls are queued per chat and sent in order. Each chat has its own token
+    bucket and all chats share a global one. A ``RetryAfter`` pauses every
+    lane for the time Telegram asks. ``NetworkError``/``TimedOut`` are retried
+    with jittered exponential backoff. A call identical to one still waiting
+    in its lane shares that call's result instead of being sent twice.
+    """
+
+    def __init__(self, bot: Bot, limiter: Optional[RateLimiter] = None):
+        self.bot = bot
+        self.limiter = limiter or RateLimiter()
+        self._lanes: Dict[str, Deque[Tuple[str, str, Dict[str, Any], asyncio.Future, float]]] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._waiting: Dict[str, asyncio.Future] = {}  # dedupe key -> future of a queued call
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        self._resume_at = 0.0  # monotonic time flood control lifts
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self.counters = {"sent": 0, "failed": 0, "retries": 0, "coalesced": 0, "flood_waits": 0}
+
+    async def send_message(self, chat_id: str, text: str, **kwargs) -> Any:
+        return await self.call("send_message", chat_id, text=text, **kwargs)
+
+    async def edit_message_text(self, chat_id: str, message_id: int, text: str, **kwargs) -> Any:
+        return await self.call("edit_message_text", chat_id, message_id=message_id, text=text, **kwargs)
+
+    async def edit_message_reply_markup(self, chat_id: str, message_id: int, **kwargs) -> Any:
+        return await self.call("edit_message_reply_markup", chat_id, message_id=message_id, **kwargs)
+
+    # Queue any Bot method that takes chat_id and wait for its result
+    async def call(self, method: str, chat_id: str, **kwargs) -> Any:
+        chat_id = str(chat_id)
+        key = self._dedupe_key(method, chat_id, kwargs)
+        if key in self._waiting:
+            self.counters["coalesced"] += 1
+            return await asyncio.shield(self._waiting[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[key] = future
+        self._lanes.setdefault(chat_id, deque()).append((key, method, kwargs, future, time.monotonic()))
+        if chat_id not in self._workers:
+            self._workers[chat_id] = asyncio.create_task(self._drain_lane(chat_id))
+        return await asyncio.shield(future)
+
+    @staticmethod
+    def _dedupe_key(method: str, chat_id: str, kwargs: Dict[str, Any]) -> str:
+        def encode(value):
+            return value.to_dict() if hasattr(value, "to_dict") else str(value)
+        return json.dumps([method, chat_id, kwargs], sort_keys=True, default=encode)
+
+    # Send one chat's calls in order; the worker exits when its lane is empty
+    async def _drain_lane(self, chat_id: str):
+        if self._in_flight is None:
+            self._in_flight = asyncio.Semaphore(MAX_IN_FLIGHT)
+        lane = self._lanes[chat_id]
+        try:
+            while lane:
+                key, method, kwargs, future, queued_at = lane.popleft()
+                self._waiting.pop(key, None)
+                async with self._in_flight:
+                    await self._send(chat_id, method, kwargs, future)
+                self._latencies.append(time.monotonic() - queued_at)
+        finally:
+            del self._lanes[chat_id]
+            del self._workers[chat_id]
+
+    async def _send(self, chat_id: str, method: str, kwargs: Dict[str, Any], future: asyncio.Future):
+        for attempt in range(MAX_ATTEMPTS):
+            await self._wait_for_flood_control()
+            await self.limiter.acquire(chat_id)
+            try:
+                with telegram_call(method):
+                    result = await getattr(self.bot, method)(chat_id=chat_id, **kwargs)
+                self.counters["sent"] += 1
+                future.set_result(result)
+                return
+            except RetryAfter as e:
+                retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+                logging.warning(f"Flood control hit sending to {chat_id}; pausing sends for {retry_after}s")
+                self.counters["flood_waits"] += 1
+                self._resume_at = max(self._resume_at, time.monotonic() + retry_after)
+                if attempt < MAX_ATTEMPTS - 1:
+                    TELEGRAM_RETRIES.inc(method=method, reason="flood_control")
+                error = e
+            except BadRequest as e:
+                # Malformed request: retrying will not help
+                error = e
+                break
+            except NetworkError as e:  # includes TimedOut
+                wait_time = BACKOFF_BASE * (2 ** attempt) * random.uniform(0.5, 1.5)
+                logging.warning(f"Network error sending to {chat_id}: {e}. Retrying in {wait_time:.1f}s")
+                error = e
+                if attempt < MAX_ATTEMPTS - 1:
+                    TELEGRAM_RETRIES.inc(method=method, reason="network")
+                    TELEGRAM_BACKOFF.inc(wait_time, reason="network")
+                    await asyncio.sleep(wait_time)
+            except Exception as e:
+                error = e
+                break
+            self.counters["retries"] += 1
+
+        self.counters["failed"] += 1
+        future.set_exception(error)
+
+    async def _wait_for_flood_control(self):
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            TELEGRAM_BACKOFF.inc(delay, reason="flood_control")
+            await asyncio.sleep(delay)
+
+    # Calls queued but not started yet
+    @property
+    def depth(self) -> int:
+        return sum(len(lane) for lane in self._lanes.values())
+
+    def stats(self) -> Dict[str, float]:
+        latencies = sorted(self._latencies)
+        stats = dict(self.counters)
+        stats["depth"] = self.depth
+        stats["active_chats"] = len(self._workers)
+        stats["latency_avg"] = sum(latencies) / len(latencies) if latencies else 0.0
+        stats["latency_p95"] = latencies[int(len(latencies) * 0.95)] if latencies else 0.0
+        stats["latency_max"] = latencies[-1] if latencies else 0.0
+        return stats
+
+
+# The application's send queue, created on first use
+def get_send_queue(bot_app: Application) -> SendQueue:
+    if "send_queue" not in bot_app.bot_data:
+        bot_app.bot_data["send_queue"] = SendQueue(bot_app.bot)
+    return bot_app.bot_data["send_queue"]
@@ -1,14 +1,32 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
 from telegram.ext import Application
-from datetime import datetime
+from datetime import date, datetime
+import asyncio
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+import pytz
+from bot.callback_data import encode_done
+from bot.render_cache import Payload, get_render_cache
+from bot.send_queue import SendQueue, get_send_queue
+from bot.subscriptions import Subscription
+from sheets.index import parse_date
 from sheets.roadmap import (
+    RoadmapSnapshot,
     get_today_tasks,
     get_today_deadlines,
-    mark_previous_pending_as_missed,
-    update_task_status,
-    task_key
+    report_status_changes
 )
-from config.settings import BOT_TOKEN
+from sheets.async_roadmap import (
+    load_snapshot_async,
+    write_statuses_async
+)
+from sheets.task import Task
+from config.settings import BOT_TOKEN, DEFAULT_TIMEZONE, get_settings
+
+# Telegram limits
+MAX_MESSAGE_LENGTH = 4096
+MAX_BUTTONS_PER_MESSAGE = 100
 
 # Format a single task nicely
 def format_task(task, index):
@@ -30,90 +48,217 @@ def format_task(task, index):
 
     return text.strip()
 
-# Format the combined message
-def build_message(tasks, deadlines):
-    lines = []
+# Telegram's length limit in UTF-16 code units (emoji count twice); tags are
+# counted too, which keeps us on the safe side of the limit
+def message_length(text: str) -> int:
+    return len(text.encode("utf-16-le")) // 2
+
+
+# Cut one oversized block on line boundaries; every line of format_task output
+# closes its own tags, so each piece stays valid HTML
+def split_block(block: str, limit: int) -> List[str]:
+    pieces, current = [], ""
+    for line in block.split("\n"):
+        if message_length(line) > limit:
+            # A single huge cell: drop its markup and cut it as plain text
+            line = re.sub(r"<[^>]+>", "", line)
+            while message_length(line) > limit:
+                line = line[:len(line) * limit // message_length(line) - 1]
+            line = line[:-1] + "…"
+        candidate = f"{current}\n{line}" if current else line
+        if message_length(candidate) > limit:
+            pieces.append(current)
+            candidate = line
+        current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+# (section header, block text, task or None) for each task and deadline line
+def summary_blocks(tasks, deadlines, tasks_header: str = "📌 <b>New Tasks Starting Today</b>\n",
+                   deadlines_header: str = "⏰ <b>Deadlines Today</b>") -> List[Tuple[str, str, Optional[Task]]]:
+    blocks = []
+    for idx, task in enumerate(tasks, 1):
+        blocks.append((tasks_header, format_task(task, idx) + "\n---", task))
+    for d in deadlines:
+        blocks.append((deadlines_header, f"- {d['Topic']} – {d['Subtopic']} (🗓️ {d['Deadline']})", None))
+    return blocks
+
+
+# Split the summary into messages below Telegram's limits. Messages break only
+# between tasks (or deadline lines), and each one lists the tasks it contains
+# so it can carry just their buttons.
+def build_message_chunks(tasks, deadlines, limit: int = MAX_MESSAGE_LENGTH) -> List[Tuple[str, List[Task]]]:
+    return chunk_blocks(summary_blocks(tasks, deadlines), limit)
+
 
-    if tasks:
-        lines.append("📌 <b>New Tasks Starting Today</b>\n")
-        for idx, task in enumerate(tasks, 1):
-            lines.append(format_task(task, idx))
-            lines.append("---")
+# Pack blocks into messages; a section header is repeated when its section
+# continues on a new message, and an empty header adds no line
+def chunk_blocks(blocks: List[Tuple[str, str, Optional[Task]]],
+                 limit: int = MAX_MESSAGE_LENGTH) -> List[Tuple[str, List[Task]]]:
+    chunks: List[Tuple[str, List[Task]]] = []
+    lines: List[str] = []
+    chunk_tasks: List[Task] = []
+    header = None
 
-    if deadlines:
-        lines.append("⏰ <b>Deadlines Today</b>")
-        for d in deadlines:
-            lines.append(f"- {d['Topic']} – {d['Subtopic']} (🗓️ {d['Deadline']})")
+    def close_chunk():
+        if lines:
+            chunks.append(("\n".join(lines), chunk_tasks))
 
-    return "\n".join(lines)
+    for block_header, block, task in blocks:
+        starts_section = block_header != header
+        addition = [block_header, block] if starts_section and block_header else [block]
+        full = len(chunk_tasks) >= MAX_BUTTONS_PER_MESSAGE and task is not None
+        if lines and (full or message_length("\n".join(lines + addition)) > limit):
+            close_chunk()
+            lines, chunk_tasks = [], []
+            addition = [block_header, block] if block_header else [block]  # repeat the section header
+
+        if message_length("\n".join(addition)) > limit:
+            pieces = split_block("\n".join(addition), limit)
+            for piece in pieces[:-1]:
+                chunks.append((piece, []))
+            addition = [pieces[-1]]
+
+        lines.extend(addition)
+        header = block_header
+        if task is not None:
+            chunk_tasks.append(task)
+
+    close_chunk()
+    return chunks
 
 # Create inline buttons with callback_data
 def create_inline_buttons(tasks):
     buttons = []
     for task in tasks:
-        key = task_key(task)
-        buttons.append([InlineKeyboardButton(text=f"✅ Done: {task['Topic']}", callback_data=f"done|{key}")])
+        buttons.append([InlineKeyboardButton(text=f"✅ Done: {task['Topic']}", callback_data=encode_done(task))])
     return InlineKeyboardMarkup(buttons)
 
+# Message texts and keyboards for a summary, rendered once per distinct content
+def render_summary(tasks: List[Task], deadlines: List[Task]) -> Payload:
+    return get_render_cache().get(tasks, deadlines, lambda: [
+        (text, create_inline_buttons(chunk_tasks) if chunk_tasks else None)
+        for text, chunk_tasks in build_message_chunks(tasks, deadlines)
+    ])
+
+# Current wall-clock time in a chat's time zone (DEFAULT_TIMEZONE if none), so
+# "today" never depends on the server's own time zone
+def local_now(timezone: Optional[str] = None) -> datetime:
+    return local_time(datetime.now(pytz.utc), timezone)
+
+# An aware moment as naive wall-clock time in a chat's time zone (DEFAULT_TIMEZONE if none)
+def local_time(moment: datetime, timezone: Optional[str] = None) -> datetime:
+    return moment.astimezone(pytz.timezone(timezone or DEFAULT_TIMEZONE)).replace(tzinfo=None)
+
+
+# One message (split only where Telegram's limits require) covering several
+# missed summaries: each day gets its own sections, oldest first
+def render_catch_up(days: List[Tuple[str, List[Task], List[Task]]], missed: int) -> Payload:
+    shown = ", ".join(day for day, _, _ in days)
+    intro = f"⏪ <b>Catching up</b>: the bot was offline for {missed} daily summar{'y' if missed == 1 else 'ies'}"
+    intro += f" ({shown})." if missed == len(days) else f"; showing the last {len(days)} ({shown})."
+
+    blocks = [("", intro, None)]
+    for day, tasks, deadlines in days:
+        blocks += summary_blocks(tasks, deadlines, f"📌 <b>Tasks starting {day}</b>\n", f"⏰ <b>Deadlines {day}</b>")
+    if len(blocks) == 1:
+        blocks.append(("", "No tasks or deadlines on those days.", None))
+    return [
+        (text, create_inline_buttons(chunk_tasks) if chunk_tasks else None)
+        for text, chunk_tasks in chunk_blocks(blocks)
+    ]
+
+
+# Steps 1-3 for one sheet: collect each day's tasks/deadlines, then mark
+# Pending tasks from before `today` as "Missed" and the days' tasks as
+# "Pending", all worked out in one pass and sent in one batched write
+async def prepare_daily_tasks(snapshot: RoadmapSnapshot, today: date,
+                              days: Iterable[str]) -> Dict[str, Tuple[List[Task], List[Task]]]:
+    # Step 1: Get each day's tasks/deadlines
+    by_day = {day: (get_today_tasks(day, snapshot), get_today_deadlines(day, snapshot)) for day in days}
+
+    # Steps 2-3: Missed and Pending statuses in one write
+    if snapshot.status_col is None:
+        print(f"Error: 'Status' column not found in spreadsheet")
+        return by_day
+    print("⚠️ Marking previous 'Pending' tasks as 'Missed'...")
+    changes = snapshot.status_changes(today, pending_days=[d for d in map(parse_date, by_day) if d])
+    outcome = await write_statuses_async(snapshot, changes)
+    report_status_changes(snapshot, changes, outcome)
+    return by_day
+
+
+# Build and send one chat's summary through the send queue
+async def deliver_summary(queue: SendQueue, chat_id: str, tasks: List[Task], deadlines: List[Task]):
+    if not tasks and not deadlines:
+        print("No tasks or deadlines found for today")
+        await queue.send_message(chat_id, "No new tasks or deadlines today.")
+        return
+
+    # Step 4: Build messages, each under Telegram's limits with its own tasks' buttons
+    # (usually already rendered for another chat or by the precompute job)
+    await deliver_payload(queue, chat_id, render_summary(tasks, deadlines))
+
+
+# Send rendered messages to one chat, falling back to plain text on errors
+async def deliver_payload(queue: SendQueue, chat_id: str, chunks: Payload):
+    # Validate chat_id
+    if not chat_id or not chat_id.strip():
+        raise ValueError("Invalid chat_id: Chat ID cannot be empty")
+
+    if len(chunks) > 1:
+        print(f"Summary is long, sending it as {len(chunks)} messages")
+    print(f"Sending message to chat ID: {chat_id}")
+
+    # Queue every chunk at once; the chat's lane in the send queue keeps them in order
+    try:
+        await asyncio.gather(*[
+            queue.send_message(chat_id, text, parse_mode="HTML", reply_markup=markup)
+            for text, markup in chunks
+        ])
+        print("Message sent successfully!")
+    except BadRequest as e:
+        await send_fallback(queue, chat_id, e)
+    except (Forbidden, RetryAfter, NetworkError) as e:
+        # Blocked, or still failing after the queue's retries: a fallback would fail the same way
+        print(f"Error sending message: {str(e)}")
+        raise
+    except Exception as e:
+        await send_fallback(queue, chat_id, e)
+
+
+# Try sending a simpler message without HTML formatting or buttons
+async def send_fallback(queue: SendQueue, chat_id: str, error: Exception):
+    print(f"Error sending message: {str(error)}")
+    if "Not Found" in str(error):
+        print("Chat ID not found. Please check your Telegram chat ID.")
+        raise ValueError(f"Chat ID {chat_id} not found. Please verify your Telegram chat ID is correct.")
+    else:
+        # Try sending a simpler message
+        await queue.send_message(
+            chat_id,
+            "Error sending formatted message. Please check the bot's configuration."
+        )
+
+
 # Send the full message + buttons
-async def send_daily_summary(bot_app: Application, chat_id: str):
+async def send_daily_summary(bot_app: Application, chat_id: str, subscription: Optional[Subscription] = None):
     try:
-        today = datetime.now()
+        today = local_now(subscription.timezone if subscription else None)
         today_str = today.strftime("%d-%m-%Y")
         print(f"Processing daily summary for {today_str}")
 
-        # Step 1: Mark missed tasks
-        mark_previous_pending_as_missed(today)
-
-        # Step 2: Get today's tasks/deadlines
-        tasks = get_today_tasks(today_str)
-        deadlines = get_today_deadlines(today_str)
-
-        if not tasks and not deadlines:
-            print("No tasks or deadlines found for today")
-            await bot_app.bot.send_message(chat_id=chat_id, text="No new tasks or deadlines today.")
-            return
-
-        # Step 3: Update sheet status to "Pending" for today's tasks
-        for t in tasks:
-            update_task_status(t["Start Date"], t["Topic"], "Pending")
-
-        # Step 4: Build message
-        text = build_message(tasks, deadlines)
-        reply_markup = create_inline_buttons(tasks) if tasks else None
-
-        # Validate chat_id
-        if not chat_id or not chat_id.strip():
-            raise ValueError("Invalid chat_id: Chat ID cannot be empty")
-
-        # Check if text is too long
-        if len(text) > 4096:
-            print("Warning: Message is too long, truncating...")
-            text = text[:4093] + "..."
-
-        print(f"Sending message to chat ID: {chat_id}")
-
-        # Send the message
-        try:
-            await bot_app.bot.send_message(
-                chat_id=chat_id,
-                text=text,
-                parse_mode="HTML",
-                reply_markup=reply_markup
-            )
-            print("Message sent successfully!")
-        except Exception as e:
-            print(f"Error sending message: {str(e)}")
-            # Try sending a simpler message without HTML formatting or buttons
-            if "Not Found" in str(e):
-                print("Chat ID not found. Please check your Telegram chat ID.")
-                raise ValueError(f"Chat ID {chat_id} not found. Please verify your Telegram chat ID is correct.")
-            else:
-                # Try sending a simpler message
-                await bot_app.bot.send_message(
-                    chat_id=chat_id,
-                    text="Error sending formatted message. Please check the bot's configuration."
-                )
+        # Read the sheet once; every step below works on this snapshot
+        if subscription:
+            snapshot = await load_snapshot_async(subscription.worksheet, subscription.spreadsheet_id)
+        else:
+            snapshot = await load_snapshot_async(get_settings().roadmap_sheets)
+
+        by_day = await prepare_daily_tasks(snapshot, today.date(), [today_str])
+        tasks, deadlines = by_day[today_str]
+        await deliver_summary(get_send_queue(bot_app), chat_id, tasks, deadlines)
     except Exception as e:
         print(f"Error in send_daily_summary: {str(e)}")
         raise
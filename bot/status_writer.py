@@ -0,0 +1,136 @@
+# Coalesced status writes for the inline "Done" buttons
+import asyncio
+import logging
+from typing import Dict, Optional, Set, Tuple
+from telegram.ext import Application
+from sheets.async_roadmap import load_snapshot_async, write_statuses_async
+from sheets.roadmap import RoadmapSnapshot
+
+# Constants
+FLUSH_WINDOW = 0.5  # seconds a change waits for others to share its write
+MAX_BATCH = 100  # changes per flush; a full batch is written straight away
+
+SheetRef = Tuple[Optional[str], str]  # (spreadsheet id or None for the configured one, worksheet)
+TaskRef = Tuple[str, str, Optional[int]]  # (Start Date, Topic, sheet row the button was resolved to)
+
+
+# The sheet row to write a change to: the row the press was resolved to while it
+# still holds that task, else the first row with its key (legacy buttons, rows moved since)
+def locate(snapshot: RoadmapSnapshot, task: TaskRef) -> Optional[int]:
+    start_date, topic, row = task
+    if row is not None and 0 <= row - 2 < len(snapshot.tasks) and \
+            snapshot.tasks[row - 2].key == f"{start_date}::{topic}":
+        return row
+    return snapshot.find_row(start_date, topic)
+
+
+class StatusWriter:
+    """Collects status changes from button presses and writes them in batches.
+
+    A change waits up to ``window`` seconds so that changes arriving close
+    together share one snapshot load and one batch update per sheet. Changes
+    to the same task are merged (the last status wins), and a repeated press
+    while a write is queued or running shares that write. ``submit()`` returns
+    a future that resolves to whether the change reached the sheet.
+    """
+
+    def __init__(self, window: float = FLUSH_WINDOW, max_batch: int = MAX_BATCH):
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[SheetRef, Dict[TaskRef, Tuple[str, asyncio.Future]]] = {}
+        self._in_flight: Dict[Tuple[SheetRef, TaskRef], Tuple[str, asyncio.Future]] = {}
+        self._timer: Optional[asyncio.Task] = None
+        self._flushes: Set[asyncio.Task] = set()
+        self.counters = {"submitted": 0, "coalesced": 0, "written": 0, "failed": 0, "flushes": 0}
+
+    def submit(self, start_date: str, topic: str, status: str,
+               sheet: SheetRef = (None, "ROADMAP"), row: Optional[int] = None) -> asyncio.Future:
+        self.counters["submitted"] += 1
+        task = (start_date, topic, row)
+
+        running = self._in_flight.get((sheet, task))
+        if running is not None and running[0] == status:
+            self.counters["coalesced"] += 1
+            return running[1]
+
+        changes = self._pending.setdefault(sheet, {})
+        if task in changes:
+            # Same task pressed again before the flush: one write, shared outcome
+            self.counters["coalesced"] += 1
+            future = changes[task][1]
+            changes[task] = (status, future)
+            return future
+
+        future = asyncio.get_running_loop().create_future()
+        changes[task] = (status, future)
+        if sum(len(c) for c in self._pending.values()) >= self.max_batch:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+        return future
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        self._timer = None
+        await self.flush()
+
+    def _start_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        flush = asyncio.create_task(self.flush())
+        self._flushes.add(flush)
+        flush.add_done_callback(self._flushes.discard)
+
+    # Write everything queued so far, one batch per sheet
+    async def flush(self):
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        self.counters["flushes"] += 1
+        for sheet, changes in pending.items():
+            for task, change in changes.items():
+                self._in_flight[(sheet, task)] = change
+        try:
+            await asyncio.gather(*[self._write_sheet(sheet, changes) for sheet, changes in pending.items()])
+        finally:
+            for sheet, changes in pending.items():
+                for task in changes:
+                    self._in_flight.pop((sheet, task), None)
+
+    async def _write_sheet(self, sheet: SheetRef, changes: Dict[TaskRef, Tuple[str, asyncio.Future]]):
+        spreadsheet_id, worksheet = sheet
+        results: Dict[TaskRef, bool] = {}
+        try:
+            snapshot = await load_snapshot_async(worksheet, spreadsheet_id)
+            if snapshot.status_col is None:
+                raise ValueError("'Status' column not found in spreadsheet")
+            rows: Dict[TaskRef, int] = {}
+            for task in changes:
+                row = locate(snapshot, task)
+                if row is None:
+                    print(f"Task not found: {task[0]}::{task[1]}")
+                    continue
+                rows[task] = row
+            outcome = await write_statuses_async(snapshot, {row: changes[task][0] for task, row in rows.items()})
+            for task, row in rows.items():
+                results[task] = outcome.get(row, False)
+                if results[task]:
+                    print(f"✅ Marking task as {changes[task][0]} → {task[0]}::{task[1]} (row {row})")
+                else:
+                    print(f"Error updating cell for {task[0]}::{task[1]}")
+        except Exception as e:
+            logging.error(f"Error writing {len(changes)} status changes to {worksheet}: {e}")
+
+        for task, (_, future) in changes.items():
+            written = results.get(task, False)
+            self.counters["written" if written else "failed"] += 1
+            if not future.done():
+                future.set_result(written)
+
+
+# The application's status writer, created on first use
+def get_status_writer(bot_app: Application) -> StatusWriter:
+    if "status_writer" not in bot_app.bot_data:
+        bot_app.bot_data["status_writer"] = StatusWriter()
+    return bot_app.bot_data["status_writer"]
@@ -0,0 +1,152 @@
+# Chats that receive the daily summary, persisted as JSON
+import json
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: changes are only serialised within this process
+    fcntl = None
+
+
+@dataclass
+class Subscription:
+    chat_id: str
+    spreadsheet_id: str
+    worksheet: str = "ROADMAP"  # or several, see sheets/sources.py
+    timezone: str = "UTC"
+    delivery_time: str = "06:30"  # local time of the daily summary, "HH:MM"
+
+    # Subscribers reading the same worksheet share one fetch per run
+    @property
+    def sheet(self) -> Tuple[str, str]:
+        return self.spreadsheet_id, self.worksheet
+
+
+class SubscriptionRegistry:
+    """Subscriptions keyed by chat id, saved to a JSON file on every change.
+
+    The file is shared by every replica. Reads pick up changes made elsewhere
+    (the file is re-read whenever it changed), and each change re-reads and
+    rewrites it under an exclusive lock on ``<path>.lock``, so two replicas
+    handling /start at once never overwrite each other's subscriptions.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._subscriptions: Dict[str, Subscription] = {}
+        self._stamp: Optional[Tuple[int, int, int]] = None  # (inode, mtime, size) of the file last read
+        with self._lock:
+            self._refresh()
+
+    @staticmethod
+    def _stat(path: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    # Re-read the file if it changed since the last read (call with _lock held)
+    def _refresh(self):
+        stamp = self._stat(self.path)
+        if stamp == self._stamp:
+            return
+        if stamp is None:
+            self._subscriptions, self._stamp = {}, None
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            self._subscriptions = {item["chat_id"]: Subscription(**item) for item in data}
+            self._stamp = stamp
+        except Exception as e:
+            print(f"Error reading subscriptions from {self.path}: {str(e)}")
+
+    # Hold the registry for a change: this process's lock, then the file lock
+    # every replica takes, with the latest file contents loaded
+    @contextmanager
+    def _changing(self):
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(f"{self.path}.lock", "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._refresh()
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # Write to a temp file and swap it in so a crash never leaves half a file
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump([asdict(s) for s in self._subscriptions.values()], f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._stamp = self._stat(self.path)
+
+    def get(self, chat_id: str) -> Optional[Subscription]:
+        with self._lock:
+            self._refresh()
+            return self._subscriptions.get(str(chat_id))
+
+    def all(self) -> List[Subscription]:
+        with self._lock:
+            self._refresh()
+            return list(self._subscriptions.values())
+
+    def __len__(self) -> int:
+        return len(self.all())
+
+    # Add a chat, or update the fields given for an existing one
+    def subscribe(self, chat_id: str, spreadsheet_id: Optional[str] = None, worksheet: Optional[str] = None,
+                  timezone: Optional[str] = None, delivery_time: Optional[str] = None) -> Subscription:
+        from config.settings import SPREADSHEET_ID, ROADMAP_SHEETS, DEFAULT_TIMEZONE, DEFAULT_DELIVERY_TIME
+        chat_id = str(chat_id)
+        with self._changing():
+            current = self._subscriptions.get(chat_id) or Subscription(
+                chat_id, SPREADSHEET_ID, ROADMAP_SHEETS, timezone=DEFAULT_TIMEZONE, delivery_time=DEFAULT_DELIVERY_TIME)
+            subscription = Subscription(
+                chat_id=chat_id,
+                spreadsheet_id=spreadsheet_id or current.spreadsheet_id,
+                worksheet=worksheet or current.worksheet,
+                timezone=timezone or current.timezone,
+                delivery_time=delivery_time or current.delivery_time,
+            )
+            self._subscriptions[chat_id] = subscription
+            self._save()
+            return subscription
+
+    def unsubscribe(self, chat_id: str) -> bool:
+        with self._changing():
+            removed = self._subscriptions.pop(str(chat_id), None) is not None
+            if removed:
+                self._save()
+            return removed
+
+    # Subscribers (all, or the given ones) grouped by (spreadsheet id, worksheet)
+    def group_by_sheet(self, subscriptions: Optional[List[Subscription]] = None) -> Dict[Tuple[str, str], List[Subscription]]:
+        groups: Dict[Tuple[str, str], List[Subscription]] = {}
+        for subscription in self.all() if subscriptions is None else subscriptions:
+            groups.setdefault(subscription.sheet, []).append(subscription)
+        return groups
+
+
+_registry: Optional[SubscriptionRegistry] = None
+
+
+# Get the shared registry, loading it from SUBSCRIPTIONS_PATH on first use
+def get_registry() -> SubscriptionRegistry:
+    global _registry
+    if _registry is None:
+        from config.settings import SUBSCRIPTIONS_PATH
+        _registry = SubscriptionRegistry(SUBSCRIPTIONS_PATH)
+    return _registry
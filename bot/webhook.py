@@ -0,0 +1,170 @@
+# Webhook mode: Telegram POSTs updates to a small embedded ASGI app
+import hmac
+import json
+import logging
+from typing import Optional
+from telegram import Update
+from telegram.ext import Application
+from metrics.server import METRICS_PATHS, metrics_response
+
+SECRET_HEADER = b"x-telegram-bot-api-secret-token"
+AUTHORIZATION_HEADER = b"authorization"
+
+
+class WebhookApp:
+    """ASGI app that feeds Telegram updates into a python-telegram-bot Application.
+
+    ``POST <path>`` checks the secret token header and queues the update.
+    ``GET /healthz`` reports liveness, ``GET /metrics`` and ``GET /trace``
+    serve metrics (metrics/server.py) to requests carrying the secret token
+    as ``Authorization: Bearer <token>``. The lifespan events start the
+    Application and register the webhook with Telegram. On shutdown the app
+    stops accepting updates (503) and waits for queued and running handlers
+    before stopping.
+    """
+
+    def __init__(self, application: Application, webhook_url: str, secret_token: str, path: str = "/telegram"):
+        self.application = application
+        self.webhook_url = webhook_url.rstrip("/") + path
+        self.secret_token = secret_token
+        self.path = path
+        self.draining = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as e:
+                    logging.error(f"Webhook startup failed: {e}")
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # Same order as Application.run_webhook, including the post_* hooks
+    async def startup(self):
+        await self.application.initialize()
+        if self.application.post_init:
+            await self.application.post_init(self.application)
+        await self.application.start()
+        await self.application.bot.set_webhook(
+            url=self.webhook_url,
+            secret_token=self.secret_token,
+            allowed_updates=Update.ALL_TYPES,
+        )
+        logging.info(f"Webhook registered at {self.webhook_url}")
+
+    # Refuse new updates, then let the Application finish everything queued
+    async def shutdown(self):
+        self.draining = True
+        logging.info(f"Draining {self.application.update_queue.qsize()} queued updates...")
+        if self.application.running:
+            await self.application.stop()
+        if self.application.post_stop:
+            await self.application.post_stop(self.application)
+        await self.application.shutdown()
+        if self.application.post_shutdown:
+            await self.application.post_shutdown(self.application)
+        logging.info("Webhook server drained and stopped")
+
+    async def _http(self, scope, receive, send):
+        method, path = scope["method"], scope["path"]
+
+        if path == "/healthz" and method in ("GET", "HEAD"):
+            if self.draining:
+                await self._respond(send, 503, {"status": "draining"})
+            else:
+                await self._respond(send, 200, {"status": "ok", "queued_updates": self.application.update_queue.qsize()})
+            return
+
+        if path in METRICS_PATHS and method in ("GET", "HEAD"):
+            # This port is public, so scrapes must bring the secret token
+            if not self._authorized(scope):
+                await self._respond(send, 401, {"error": "unauthorized"})
+                return
+            await self._send_body(send, *metrics_response(path))
+            return
+
+        if path != self.path:
+            await self._respond(send, 404, {"error": "not found"})
+            return
+        if method != "POST":
+            await self._respond(send, 405, {"error": "method not allowed"})
+            return
+        if self.draining:
+            # Telegram retries later, most likely reaching another replica
+            await self._respond(send, 503, {"error": "shutting down"})
+            return
+
+        token = dict(scope["headers"]).get(SECRET_HEADER, b"").decode("latin-1")
+        if not hmac.compare_digest(token, self.secret_token):
+            await self._respond(send, 403, {"error": "invalid secret token"})
+            return
+
+        body = await self._read_body(receive)
+        try:
+            update = Update.de_json(json.loads(body), self.application.bot)
+        except Exception as e:
+            logging.error(f"Invalid update payload: {e}")
+            await self._respond(send, 400, {"error": "invalid update"})
+            return
+
+        # Handlers run on the Application's own tasks (concurrently if configured),
+        # so Telegram gets its 200 straight away
+        await self.application.update_queue.put(update)
+        await self._respond(send, 200, {"ok": True})
+
+    def _authorized(self, scope) -> bool:
+        header = dict(scope["headers"]).get(AUTHORIZATION_HEADER, b"").decode("latin-1")
+        scheme, _, token = header.partition(" ")
+        return scheme.lower() == "bearer" and hmac.compare_digest(token.strip(), self.secret_token)
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                return body
+
+    @staticmethod
+    async def _respond(send, status: int, payload: dict):
+        await WebhookApp._send_body(send, status, "application/json", json.dumps(payload).encode())
+
+    @staticmethod
+    async def _send_body(send, status: int, content_type: str, body: bytes):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# Serve the webhook with uvicorn until SIGINT/SIGTERM, then drain
+def run_webhook(application: Application, webhook_url: str, secret_token: str, port: int,
+                path: str = "/telegram", drain_timeout: Optional[int] = 30):
+    import uvicorn
+
+    app = WebhookApp(application, webhook_url, secret_token, path)
+    config = uvicorn.Config(
+        app,
+        host="0.0.0.0",
+        port=port,
+        lifespan="on",
+        log_level="info",
+        timeout_graceful_shutdown=drain_timeout,
+    )
+    uvicorn.Server(config).run()
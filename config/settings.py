@@ -1,40 +1,191 @@
 import os
+import base64
+import hashlib
+import json
 import logging
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Get environment variables with validation
-BOT_TOKEN = os.getenv("BOT_TOKEN")
-if not BOT_TOKEN:
-    logging.error("BOT_TOKEN not found in environment variables")
-    raise ValueError("BOT_TOKEN environment variable is required")
-
-# Fix escape characters in the token if present
-if r'\x3a' in BOT_TOKEN:
-    BOT_TOKEN = BOT_TOKEN.replace(r'\x3a', ':')
-    logging.warning("Fixed escape character in BOT_TOKEN")
-
-SPREADSHEET_ID = os.getenv("SPREADSHEET_ID")
-if not SPREADSHEET_ID:
-    logging.error("SPREADSHEET_ID not found in environment variables")
-    raise ValueError("SPREADSHEET_ID environment variable is required")
-
-SERVICE_ACCOUNT_PATH = os.getenv("SERVICE_ACCOUNT_PATH")
-if not SERVICE_ACCOUNT_PATH:
-    logging.error("SERVICE_ACCOUNT_PATH not found in environment variables")
-    raise ValueError("SERVICE_ACCOUNT_PATH environment variable is required")
-
-# Get chat ID from environment (for deployment)
-CHAT_ID = os.getenv("CHAT_ID")
-if CHAT_ID:
-    logging.info(f"Using CHAT_ID from environment variable")
-
-# Print settings for debugging (without exposing the full token)
-token_preview = BOT_TOKEN[:8] + "..." if BOT_TOKEN else "None"
-logging.info(f"BOT_TOKEN: {token_preview}")
-logging.info(f"SPREADSHEET_ID: {SPREADSHEET_ID}")
-logging.info(f"SERVICE_ACCOUNT_PATH: {SERVICE_ACCOUNT_PATH}")
-if CHAT_ID:
-    logging.info(f"CHAT_ID: {CHAT_ID}")
+import re
+from dataclasses import dataclass, field, fields
+from typing import Optional, Tuple
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Every setting, read from the environment (and .env) once per process.
+
+    Use ``get_settings()``; module attributes such as ``BOT_TOKEN`` are kept
+    for existing imports and read from the same object.
+    """
+
+    bot_token: str = field(repr=False)
+    spreadsheet_id: str
+    roadmap_sheets: str
+    # Key file path, or the key itself decoded from SERVICE_ACCOUNT_JSON_BASE64
+    service_account_path: Optional[str]
+    service_account_info: Optional[dict] = field(repr=False)
+    chat_id: Optional[str]
+    allowed_chat_ids: Tuple[str, ...]
+    bot_mode: str
+    webhook_url: Optional[str]
+    webhook_secret: str = field(repr=False)
+    port: int
+    concurrent_updates: int
+    subscriptions_path: str
+    default_timezone: str
+    default_delivery_time: str
+    delivery_jitter: float
+    roadmap_cache_ttl: float
+    roadmap_cache_validate: bool
+    roadmap_sync: str
+    task_store_path: str
+    task_store_sync_interval: float
+    job_runs_path: str
+    leader_lease_backend: str
+    leader_lease_path: str
+    leader_lease_ttl: float
+    metrics_port: int
+
+    # Whether a chat may use the bot; an empty allowlist lets every chat in
+    def allows_chat(self, chat_id) -> bool:
+        return not self.allowed_chat_ids or (chat_id is not None and str(chat_id) in self.allowed_chat_ids)
+
+
+def _flag(value: str) -> bool:
+    return value.lower() in ("1", "true", "yes")
+
+
+# Parse and validate the environment
+def load_settings() -> Settings:
+    from dotenv import load_dotenv
+
+    # Load environment variables from .env file
+    load_dotenv()
+
+    # Get environment variables with validation
+    bot_token = os.getenv("BOT_TOKEN")
+    if not bot_token:
+        logging.error("BOT_TOKEN not found in environment variables")
+        raise ValueError("BOT_TOKEN environment variable is required")
+
+    # Fix escape characters in the token if present
+    if r'\x3a' in bot_token:
+        bot_token = bot_token.replace(r'\x3a', ':')
+        logging.warning("Fixed escape character in BOT_TOKEN")
+
+    spreadsheet_id = os.getenv("SPREADSHEET_ID")
+    if not spreadsheet_id:
+        logging.error("SPREADSHEET_ID not found in environment variables")
+        raise ValueError("SPREADSHEET_ID environment variable is required")
+
+    # A base64-encoded key (the usual way on hosted platforms) is decoded in
+    # memory and used directly; otherwise the key file at SERVICE_ACCOUNT_PATH
+    service_account_info = None
+    encoded_key = os.getenv("SERVICE_ACCOUNT_JSON_BASE64")
+    if encoded_key:
+        try:
+            service_account_info = json.loads(base64.b64decode(encoded_key).decode("utf-8"))
+        except Exception as e:
+            raise ValueError(f"SERVICE_ACCOUNT_JSON_BASE64 is not a base64-encoded service account key: {e}")
+    service_account_path = os.getenv("SERVICE_ACCOUNT_PATH")
+    if not service_account_path and service_account_info is None:
+        logging.error("SERVICE_ACCOUNT_PATH not found in environment variables")
+        raise ValueError("SERVICE_ACCOUNT_PATH or SERVICE_ACCOUNT_JSON_BASE64 environment variable is required")
+
+    # How updates arrive: "polling" (default) or "webhook"
+    bot_mode = os.getenv("BOT_MODE", "polling").lower()
+    # Public base URL Telegram posts to; Render provides RENDER_EXTERNAL_URL for web services
+    webhook_url = os.getenv("WEBHOOK_URL") or os.getenv("RENDER_EXTERNAL_URL")
+    if bot_mode == "webhook" and not webhook_url:
+        logging.error("WEBHOOK_URL not found in environment variables")
+        raise ValueError("WEBHOOK_URL environment variable is required when BOT_MODE=webhook")
+
+    # How an expired roadmap is reloaded: "full" downloads the whole sheet,
+    # "incremental" re-reads only the key columns and the rows that changed
+    roadmap_sync = os.getenv("ROADMAP_SYNC", "full").lower()
+    if roadmap_sync not in ("full", "incremental"):
+        raise ValueError(f"ROADMAP_SYNC must be 'full' or 'incremental', got '{roadmap_sync}'")
+
+    default_delivery_time = os.getenv("DEFAULT_DELIVERY_TIME", "06:30")
+    if not re.match(r"^([01]\d|2[0-3]):[0-5]\d$", default_delivery_time):
+        raise ValueError(f"DEFAULT_DELIVERY_TIME must be HH:MM (24-hour), got '{default_delivery_time}'")
+
+    # Leader election between replicas: only the replica holding the lease runs the
+    # daily summary. "" runs every job here (single replica); "file" and "sqlite"
+    # share the lease through LEADER_LEASE_PATH, which every replica must see
+    leader_lease_backend = os.getenv("LEADER_LEASE_BACKEND", "").lower()
+    if leader_lease_backend not in ("", "file", "sqlite"):
+        raise ValueError(f"LEADER_LEASE_BACKEND must be 'file' or 'sqlite', got '{leader_lease_backend}'")
+
+    settings = Settings(
+        bot_token=bot_token,
+        spreadsheet_id=spreadsheet_id,
+        # Worksheet new chats read; "Tab1,Tab2,<spreadsheet id>/Tab" reads several
+        # (from this and other spreadsheets) as one roadmap
+        roadmap_sheets=os.getenv("ROADMAP_SHEETS", "ROADMAP"),
+        service_account_path=service_account_path,
+        service_account_info=service_account_info,
+        # Get chat ID from environment (for deployment)
+        chat_id=os.getenv("CHAT_ID"),
+        # Chats allowed to subscribe, press buttons and pick sheets (comma-separated);
+        # defaults to CHAT_ID, so a deployment only answers its owner
+        allowed_chat_ids=tuple(c.strip() for c in os.getenv("ALLOWED_CHAT_IDS", os.getenv("CHAT_ID", "")).split(",")
+                               if c.strip()),
+        bot_mode=bot_mode,
+        webhook_url=webhook_url,
+        # Derived from the token by default so every replica agrees on it
+        webhook_secret=os.getenv("WEBHOOK_SECRET") or hashlib.sha256(bot_token.encode()).hexdigest()[:32],
+        port=int(os.getenv("PORT", "8080")),
+        # Updates handled at the same time (button presses, commands)
+        concurrent_updates=int(os.getenv("CONCURRENT_UPDATES", "16")),
+        # Daily summary subscribers (chat, sheet, time zone) and the time zone new chats start with
+        subscriptions_path=os.getenv("SUBSCRIPTIONS_PATH", "data/subscriptions.json"),
+        default_timezone=os.getenv("DEFAULT_TIMEZONE", "UTC"),
+        # Local time new chats get their summary at, and the longest a bucket of
+        # chats sharing a delivery time is spread over (seconds)
+        default_delivery_time=default_delivery_time,
+        delivery_jitter=float(os.getenv("DELIVERY_JITTER", "120")),
+        # Roadmap cache: seconds a downloaded sheet is reused, and whether an expired
+        # copy is first checked against the spreadsheet's Drive modifiedTime
+        roadmap_cache_ttl=float(os.getenv("ROADMAP_CACHE_TTL", "60")),
+        roadmap_cache_validate=_flag(os.getenv("ROADMAP_CACHE_VALIDATE", "false")),
+        roadmap_sync=roadmap_sync,
+        # Local SQLite copy of the roadmap that commands and buttons read from; status
+        # changes are replayed to the sheet every TASK_STORE_SYNC_INTERVAL seconds.
+        # Leave TASK_STORE_PATH empty to read and write the sheet directly
+        task_store_path=os.getenv("TASK_STORE_PATH", ""),
+        task_store_sync_interval=float(os.getenv("TASK_STORE_SYNC_INTERVAL", "60")),
+        # Which daily runs have happened, so runs missed while the bot was down are
+        # caught up at startup; replicas should share it like the lease
+        job_runs_path=os.getenv("JOB_RUNS_PATH", "data/job_runs.json"),
+        leader_lease_backend=leader_lease_backend,
+        leader_lease_path=os.getenv("LEADER_LEASE_PATH") or (
+            "data/leases.db" if leader_lease_backend == "sqlite" else "data/leases"),
+        leader_lease_ttl=float(os.getenv("LEADER_LEASE_TTL", "30")),
+        # Port serving /metrics and /trace without a token (0 turns it off); keep it
+        # private. Webhook mode also serves them on PORT behind WEBHOOK_SECRET
+        metrics_port=int(os.getenv("METRICS_PORT", "0")),
+    )
+
+    # Print settings for debugging (without exposing the token or the key)
+    logging.info(f"Settings: token {bot_token[:8]}..., spreadsheet {spreadsheet_id}, "
+                 f"service account {'from SERVICE_ACCOUNT_JSON_BASE64' if service_account_info else service_account_path}"
+                 f"{f', chat {settings.chat_id}' if settings.chat_id else ''}")
+    return settings
+
+
+_settings: Optional[Settings] = None
+_NAMES = {f.name.upper(): f.name for f in fields(Settings)}
+
+
+# Get the process-wide settings, parsed on first use
+def get_settings() -> Settings:
+    global _settings
+    if _settings is None:
+        _settings = load_settings()
+    return _settings
+
+
+# `from config.settings import BOT_TOKEN` and friends read the shared Settings
+def __getattr__(name: str):
+    if name in _NAMES:
+        return getattr(get_settings(), _NAMES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -13,6 +13,8 @@ def setup_credentials():
     Set up credentials for deployment.
     This function handles decoding base64-encoded service account credentials
     which is a common approach for deploying to platforms like PythonAnywhere.
+    The bot itself reads SERVICE_ACCOUNT_JSON_BASE64 in memory; this writes a
+    key file for scripts that need one (test_bot.py).
     """
     # Create credentials directory if it doesn't exist
     os.makedirs('credentials', exist_ok=True)
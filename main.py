@@ -1,7 +1,6 @@
-import telegram
-print("🚀 python-telegram-bot version:", telegram.__version__)
+import functools
 import logging
-from datetime import time
+from datetime import datetime, timedelta, timezone
 import pytz
 from telegram.ext import (
     ApplicationBuilder,
@@ -10,8 +9,38 @@ from telegram.ext import (
 )
 from bot.sender import send_daily_summary
 from bot.handler import handle_button
-from config.settings import BOT_TOKEN
-from deploy_setup import setup_credentials
+from bot.delivery import (
+    DAILY_SUMMARY_JOB,
+    PRECOMPUTE_JOB,
+    PRECOMPUTE_LEAD,
+    group_by_bucket,
+    parse_delivery_time
+)
+from bot.job_runs import last_daily_occurrence
+from bot.leader import create_leader_elector, get_leader_elector, leader_only
+from bot.scheduler import (
+    catch_up_daily_summary,
+    precompute_daily_summaries,
+    record_baseline,
+    run_daily_summary,
+    sync_task_store
+)
+from bot.subscriptions import get_registry
+from bot.webhook import run_webhook
+from config.settings import (
+    BOT_TOKEN,
+    BOT_MODE,
+    CONCURRENT_UPDATES,
+    METRICS_PORT,
+    PORT,
+    TASK_STORE_PATH,
+    TASK_STORE_SYNC_INTERVAL,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+    get_settings
+)
+from metrics.instruments import job_run
+from metrics.server import start_metrics_server
 
 # Set up logging
 logging.basicConfig(
@@ -19,9 +48,6 @@ logging.basicConfig(
     level=logging.INFO
 )
 
-# Set up credentials for deployment
-setup_credentials()
-
 # Your Telegram chat ID
 # To get your chat ID, send a message to @userinfobot on Telegram
 # You need to replace this with your actual chat ID
@@ -29,18 +55,33 @@ setup_credentials()
 from config.settings import CHAT_ID
 YOUR_CHAT_ID = CHAT_ID if CHAT_ID else '1798133963'  # Use environment variable if available
 
+def allowed_only(command):
+    """Run a command only in chats on the allowlist (ALLOWED_CHAT_IDS); other chats are turned away"""
+    @functools.wraps(command)
+    async def wrapper(update, context):
+        chat_id = update.effective_chat.id
+        if not get_settings().allows_chat(chat_id):
+            logging.warning(f"Refused {command.__name__} from chat {chat_id}")
+            await update.message.reply_text("⛔ This bot is private.")
+            return
+        await command(update, context)
+    return wrapper
+
 async def send_summary_command(update, context):
     """Handler for the /summary command"""
     chat_id = update.effective_chat.id
     await update.message.reply_text("Generating your daily summary...")
     try:
-        await send_daily_summary(context.application, str(chat_id))
+        subscription = get_registry().get(str(chat_id))
+        await send_daily_summary(context.application, str(chat_id), subscription)
     except Exception as e:
         logging.error(f"Error sending summary: {e}")
         await update.message.reply_text(f"Error: {str(e)}")
 
-async def start_command(update, _):
+async def start_command(update, context):
     """Handler for the /start command"""
+    get_registry().subscribe(str(update.effective_chat.id))
+    schedule_deliveries(context.application)
     await update.message.reply_text(
         "👋 Welcome to the Roadmap Bot!\n\n"
         "I'll send you daily summaries of your tasks and deadlines.\n"
@@ -48,53 +89,250 @@ async def start_command(update, _):
         "Use /help to see all available commands."
     )
 
+async def stop_command(update, context):
+    """Handler for the /stop command"""
+    get_registry().unsubscribe(str(update.effective_chat.id))
+    schedule_deliveries(context.application)
+    await update.message.reply_text("You won't receive daily summaries anymore. Use /start to subscribe again.")
+
+async def timezone_command(update, context):
+    """Handler for the /timezone command, e.g. /timezone Africa/Accra"""
+    if not context.args:
+        subscription = get_registry().get(str(update.effective_chat.id))
+        current = subscription.timezone if subscription else "not subscribed"
+        await update.message.reply_text(f"Your time zone: {current}\nUsage: /timezone Area/City")
+        return
+    try:
+        pytz.timezone(context.args[0])
+    except pytz.UnknownTimeZoneError:
+        await update.message.reply_text(f"Unknown time zone: {context.args[0]}")
+        return
+    get_registry().subscribe(str(update.effective_chat.id), timezone=context.args[0])
+    schedule_deliveries(context.application)
+    await update.message.reply_text(f"Time zone set to {context.args[0]}")
+
+async def time_command(update, context):
+    """Handler for the /time command, e.g. /time 07:15"""
+    delivery_time = parse_delivery_time(context.args[0]) if context.args else None
+    if delivery_time is None:
+        await update.message.reply_text("Usage: /time HH:MM (24-hour, in your time zone)")
+        return
+    subscription = get_registry().subscribe(str(update.effective_chat.id), delivery_time=delivery_time)
+    schedule_deliveries(context.application)
+    await update.message.reply_text(f"Daily summary time set to {delivery_time} ({subscription.timezone})")
+
+async def sheet_command(update, context):
+    """Handler for the /sheet command, e.g. /sheet <spreadsheet_id> [worksheet], or several: Tab1,Tab2,<id>/Tab"""
+    if not context.args:
+        await update.message.reply_text("Usage: /sheet <spreadsheet_id> [worksheet[,worksheet,<spreadsheet_id>/worksheet...]]")
+        return
+    # Tab names may contain spaces ("Team B"), so the rest of the message is the worksheet
+    worksheet = " ".join(context.args[1:]) or None
+    subscription = get_registry().subscribe(str(update.effective_chat.id), spreadsheet_id=context.args[0],
+                                            worksheet=worksheet)
+    await update.message.reply_text(f"Roadmap set to worksheet '{subscription.worksheet}' of {subscription.spreadsheet_id}")
+
 async def help_command(update, _):
     """Handler for the /help command"""
     await update.message.reply_text(
         "📚 Available commands:\n\n"
-        "/start - Start the bot\n"
+        "/start - Start the bot and subscribe to daily summaries\n"
+        "/stop - Stop daily summaries\n"
         "/summary - Get your daily summary\n"
+        "/timezone - Set your time zone (e.g. /timezone Africa/Accra)\n"
+        "/time - Set when your daily summary arrives (e.g. /time 07:15)\n"
+        "/sheet - Use your own spreadsheet (/sheet <spreadsheet_id> [worksheet]; list several as Tab1,Tab2)\n"
         "/help - Show this help message"
     )
 
+def scheduled_for(context, period: timedelta):
+    """When a repeating job was due; the scheduler may already have moved next_t on by one period.
+    Not for daily jobs: a day is not always 24h long, see scheduled_daily_summary"""
+    next_t = context.job.next_t
+    if next_t is None:
+        return None
+    return next_t if next_t <= datetime.now(timezone.utc) else next_t - period
+
 async def scheduled_daily_summary(context):
-    """Send the daily summary at scheduled time"""
+    """Send the daily summary to the chats of one delivery bucket at their scheduled time"""
     try:
-        await send_daily_summary(context.application, YOUR_CHAT_ID)
-        logging.info("Daily summary sent successfully")
+        # The delivery this run is for, in the bucket's own zone (next_t - 24h is off by an hour across DST)
+        bucket = context.job.data
+        scheduled = bucket.last_occurrence(datetime.now(timezone.utc))
+        with job_run("daily_summary", scheduled):
+            if await run_daily_summary(context.application, bucket, scheduled) is not None:
+                logging.info(f"Daily summary {context.job.data.key} sent successfully")
     except Exception as e:
         logging.error(f"Error in scheduled job: {e}")
 
+async def scheduled_catch_up(context):
+    """Send one combined summary for the daily runs missed while the bot was down"""
+    try:
+        with job_run("catch_up"):
+            await catch_up_daily_summary(context.application)
+    except Exception as e:
+        logging.error(f"Error in catch-up: {e}")
+
+async def scheduled_store_sync(context):
+    """Write queued status changes to the sheet and refresh the local task store"""
+    try:
+        with job_run("task_store_sync", scheduled_for(context, timedelta(seconds=TASK_STORE_SYNC_INTERVAL))):
+            await sync_task_store()
+    except Exception as e:
+        logging.error(f"Error in task store sync: {e}")
+
+async def scheduled_precompute(context):
+    """Render a delivery bucket's summaries shortly before its send"""
+    try:
+        scheduled = last_daily_occurrence(context.job.data.at(PRECOMPUTE_LEAD), datetime.now(timezone.utc))
+        with job_run("precompute_summaries", scheduled):
+            await precompute_daily_summaries(bucket=context.job.data)
+    except Exception as e:
+        logging.error(f"Error precomputing summaries: {e}")
+
+async def renew_leadership(context):
+    """Take or keep the scheduler lease (runs on every replica)"""
+    elector = get_leader_elector(context.application)
+    was_leader = elector.is_leader
+    if not await elector.renew():
+        return
+    # Chats may have subscribed (or moved bucket) through another replica: the
+    # leader keeps one job per bucket in the shared registry
+    schedule_deliveries(context.application)
+    if not was_leader:
+        # A new leader sends whatever the previous one missed
+        context.job_queue.run_once(leader_only(scheduled_catch_up), when=0, name="catch_up")
+
+def schedule_deliveries(application, fresh: bool = True):
+    """Keep one daily summary job (and its precompute) per delivery bucket in use.
+
+    Jobs of buckets nobody is in any more are removed. With ``fresh``, a new
+    bucket starts with its next delivery time; at startup the catch-up pass
+    decides instead.
+    """
+    job_queue = application.job_queue
+    buckets = {bucket.key: bucket for bucket in group_by_bucket(get_registry().all())}
+    scheduled = set()
+    for job in job_queue.jobs():
+        kind, _, key = job.name.partition(":")
+        if kind not in (DAILY_SUMMARY_JOB, PRECOMPUTE_JOB):
+            continue
+        if key in buckets:
+            scheduled.add(key)
+        else:
+            job.schedule_removal()
+
+    for key, bucket in buckets.items():
+        if key in scheduled:
+            continue
+        if fresh:
+            record_baseline(bucket)
+        job_queue.run_daily(
+            leader_only(scheduled_daily_summary),
+            time=bucket.at(),  # local time in the bucket's zone, DST included
+            days=(0, 1, 2, 3, 4, 5, 6),  # All days of the week
+            name=bucket.job_name,
+            data=bucket,
+            job_kwargs={"max_instances": 1, "coalesce": True}  # never overlap a slow run with the next one
+        )
+        # Render the summaries a few minutes early so the send itself is quick
+        job_queue.run_daily(
+            leader_only(scheduled_precompute),
+            time=bucket.at(PRECOMPUTE_LEAD),
+            days=(0, 1, 2, 3, 4, 5, 6),
+            name=bucket.precompute_job_name,
+            data=bucket,
+            job_kwargs={"max_instances": 1, "coalesce": True}
+        )
+        logging.info(f"Daily summary scheduled at {bucket.delivery_time} {bucket.timezone} every day")
+
+async def release_leadership(application):
+    """Hand the scheduler lease over straight away on a clean shutdown"""
+    elector = get_leader_elector(application)
+    if elector is not None:
+        await elector.release()
+
 def main():
     """Run the bot with job queue"""
+    import telegram
+    print("🚀 python-telegram-bot version:", telegram.__version__)
+
     # Create application
-    application = ApplicationBuilder().token(BOT_TOKEN).build()
+    application = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(CONCURRENT_UPDATES)
+        .post_stop(release_leadership)
+        .build()
+    )
 
     # Add command handlers
-    application.add_handler(CommandHandler("start", start_command))
+    application.add_handler(CommandHandler("start", allowed_only(start_command)))
     application.add_handler(CommandHandler("help", help_command))
-    application.add_handler(CommandHandler("summary", send_summary_command))
+    application.add_handler(CommandHandler("summary", allowed_only(send_summary_command)))
+    application.add_handler(CommandHandler("stop", allowed_only(stop_command)))
+    application.add_handler(CommandHandler("timezone", allowed_only(timezone_command)))
+    application.add_handler(CommandHandler("time", allowed_only(time_command)))
+    application.add_handler(CommandHandler("sheet", allowed_only(sheet_command)))
 
     # Add callback query handler for buttons
     application.add_handler(CallbackQueryHandler(handle_button))
 
-    # Schedule daily summary using the built-in job queue
-    # Set to run at 6:30 AM GMT+0 (UTC)
+    # Keep sending to the configured chat until others subscribe
+    registry = get_registry()
+    if not len(registry):
+        registry.subscribe(YOUR_CHAT_ID)
+
+    # Chats taken off the allowlist stop getting summaries and writing to the sheet
+    for subscription in registry.all():
+        if not get_settings().allows_chat(subscription.chat_id):
+            logging.warning(f"Chat {subscription.chat_id} is not in ALLOWED_CHAT_IDS; unsubscribing it")
+            registry.unsubscribe(subscription.chat_id)
+    if not get_settings().allowed_chat_ids:
+        logging.warning("ALLOWED_CHAT_IDS and CHAT_ID are empty: any Telegram chat can use this bot")
+
+    # With several replicas, the scheduled sends run only on the lease holder
     job_queue = application.job_queue
-    scheduled_time = time(hour=6, minute=30, tzinfo=pytz.UTC)
-    job_queue.run_daily(
-        scheduled_daily_summary,
-        time=scheduled_time,  # Explicitly set to UTC timezone
-        days=(0, 1, 2, 3, 4, 5, 6),  # All days of the week
-        name="daily_summary"
-    )
+    elector = create_leader_elector()
+    if elector is not None:
+        application.bot_data["leader"] = elector
+        job_queue.run_repeating(
+            renew_leadership,
+            interval=elector.renew_interval,
+            first=0,
+            name="leader_lease",
+            job_kwargs={"max_instances": 1, "coalesce": True}
+        )
+        logging.info(f"Leader election on: {elector.holder} competing for the scheduler lease")
+    else:
+        # Recover the daily runs missed while the bot was down (with leader
+        # election this happens whenever a replica becomes leader)
+        job_queue.run_once(scheduled_catch_up, when=0, name="catch_up")
+
+    # One daily summary job per delivery bucket: chats sharing a time zone and
+    # a local delivery time (see /time and /timezone)
+    schedule_deliveries(application, fresh=False)
 
-    # Log the scheduled time
-    logging.info(f"Daily summary scheduled to run at 06:30 AM UTC (GMT+0) every day")
+    # Keep the local task store and the sheet in step (every replica replays its own outbox)
+    if TASK_STORE_PATH:
+        job_queue.run_repeating(
+            scheduled_store_sync,
+            interval=TASK_STORE_SYNC_INTERVAL,
+            first=1,
+            name="task_store_sync",
+            job_kwargs={"max_instances": 1, "coalesce": True}
+        )
+        logging.info(f"Task store {TASK_STORE_PATH} syncing every {TASK_STORE_SYNC_INTERVAL:g}s")
 
     # Start the bot
-    print("Bot running with job queue...")
-    application.run_polling()
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+    if BOT_MODE == "webhook":
+        print(f"Bot running with job queue, webhook server on port {PORT}...")
+        run_webhook(application, WEBHOOK_URL, WEBHOOK_SECRET, PORT)
+    else:
+        print("Bot running with job queue...")
+        application.run_polling()
 
 if __name__ == '__main__':
     try:
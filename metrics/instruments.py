@@ -0,0 +1,92 @@
+# The bot's metrics: Sheets calls, Telegram sends, button presses and scheduled jobs
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+from metrics.registry import JOB_BUCKETS, get_metrics
+from metrics.spans import span
+
+_metrics = get_metrics()
+
+SHEETS_CALLS = _metrics.counter(
+    "sheets_api_calls_total", "Google Sheets API calls by operation and outcome", ("operation", "outcome"))
+SHEETS_LATENCY = _metrics.histogram(
+    "sheets_api_latency_seconds", "Google Sheets API call latency", ("operation",))
+SHEETS_RETRIES = _metrics.counter(
+    "sheets_retries_total", "Google Sheets calls retried after an error", ("operation",))
+SHEETS_BACKOFF = _metrics.counter(
+    "sheets_backoff_seconds_total", "Time spent waiting before Google Sheets retries", ("operation",))
+
+TELEGRAM_CALLS = _metrics.counter(
+    "telegram_api_calls_total", "Bot API calls by method and outcome", ("method", "outcome"))
+TELEGRAM_LATENCY = _metrics.histogram(
+    "telegram_api_latency_seconds", "Bot API call latency, one observation per attempt", ("method",))
+TELEGRAM_ERRORS = _metrics.counter(
+    "telegram_api_errors_total", "Failed Bot API attempts by error type", ("method", "error"))
+TELEGRAM_RETRIES = _metrics.counter(
+    "telegram_retries_total", "Bot API calls retried", ("method", "reason"))
+TELEGRAM_BACKOFF = _metrics.counter(
+    "telegram_backoff_seconds_total", "Time spent waiting on backoff and flood control", ("reason",))
+
+CALLBACK_LATENCY = _metrics.histogram(
+    "callback_latency_seconds", "Button press handling time, up to the sheet write's outcome", ("action",))
+CALLBACK_ANSWER_LATENCY = _metrics.histogram(
+    "callback_answer_latency_seconds", "Time from receiving a button press to acknowledging it")
+
+JOB_RUNS = _metrics.counter("job_runs_total", "Scheduled job runs by outcome", ("job", "outcome"))
+JOB_DURATION = _metrics.histogram("job_duration_seconds", "Scheduled job run time", ("job",), JOB_BUCKETS)
+JOB_LAG = _metrics.histogram(
+    "job_lag_seconds", "Delay between a job's scheduled time and its start", ("job",),
+    (0.01, 0.05, 0.1, 0.5, 1, 5, 15, 60, 300))
+
+
+# Count and time one Sheets request, as a span of the current trace
+@contextmanager
+def sheets_call(operation: str) -> Iterator[None]:
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        with span(f"sheets.{operation}"):
+            yield
+        outcome = "ok"
+    finally:
+        SHEETS_LATENCY.observe(time.perf_counter() - started, operation=operation)
+        SHEETS_CALLS.inc(operation=operation, outcome=outcome)
+
+
+def record_sheets_retry(operation: str, wait_time: float = 0):
+    SHEETS_RETRIES.inc(operation=operation)
+    SHEETS_BACKOFF.inc(wait_time, operation=operation)
+
+
+# Count and time one Bot API attempt, as a span of the current trace
+@contextmanager
+def telegram_call(method: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        with span(f"telegram.{method}"):
+            yield
+    except Exception as e:
+        TELEGRAM_ERRORS.inc(method=method, error=type(e).__name__)
+        TELEGRAM_CALLS.inc(method=method, outcome="error")
+        raise
+    else:
+        TELEGRAM_CALLS.inc(method=method, outcome="ok")
+    finally:
+        TELEGRAM_LATENCY.observe(time.perf_counter() - started, method=method)
+
+
+# Time a scheduled job run; `scheduled_at` (aware) is when it was due to start
+@contextmanager
+def job_run(job: str, scheduled_at: Optional[datetime] = None) -> Iterator[None]:
+    if scheduled_at is not None:
+        lag = (datetime.now(timezone.utc) - scheduled_at).total_seconds()
+        JOB_LAG.observe(max(lag, 0.0), job=job)
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        JOB_DURATION.observe(time.perf_counter() - started, job=job)
+        JOB_RUNS.inc(job=job, outcome=outcome)
@@ -0,0 +1,46 @@
+# /metrics and /trace over HTTP: routes for the webhook app, or a small server in polling mode
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from metrics.registry import get_metrics
+from metrics.spans import last_traces
+
+# Constants
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+METRICS_PATHS = ("/metrics", "/trace")
+
+
+# (status, content type, body) for a metrics path, or None if the path is not ours
+def metrics_response(path: str) -> Optional[Tuple[int, str, bytes]]:
+    if path == "/metrics":
+        return 200, METRICS_CONTENT_TYPE, get_metrics().render().encode()
+    if path == "/trace":
+        # Span timings of the last run of each traced job (e.g. daily_fanout)
+        traces = {name: run.to_dict() for name, run in last_traces().items()}
+        return 200, "application/json", json.dumps(traces).encode()
+    return None
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        response = metrics_response(self.path.split("?", 1)[0])
+        status, content_type, body = response or (404, "application/json", b'{"error": "not found"}')
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # scrapes every few seconds would flood the log
+
+
+# Serve the endpoints on a daemon thread (polling mode has no web server of its own)
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logging.info(f"Metrics served on port {port} (/metrics, /trace)")
+    return server
@@ -0,0 +1,133 @@
+# Span-style timing for one run of a job, e.g. the daily fan-out
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Constants
+MAX_SPANS = 5000  # spans kept per trace; later ones are only counted
+
+_current: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_last_traces: Dict[str, "Trace"] = {}
+
+
+class Span:
+    """One timed step; children are the steps started inside it."""
+
+    __slots__ = ("name", "attributes", "trace", "start", "end", "children")
+
+    def __init__(self, name: str, attributes: Dict[str, str], trace: "Trace"):
+        self.name = name
+        self.attributes = attributes
+        self.trace = trace
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: List["Span"] = []
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "attributes": self.attributes,
+            "offset": round(self.start - self.trace.root.start, 6),
+            "duration": round(self.duration, 6),
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+class Trace:
+    """The spans of one run, rooted at a span named after the run.
+
+    Spans opened with ``span()`` attach to whichever span is current in their
+    context, so steps started from ``asyncio.gather`` tasks and from Sheets
+    worker threads (the executor copies the context) nest under the step that
+    started them. ``summary()`` folds the spans by path, which is what a
+    fan-out with thousands of sends needs.
+    """
+
+    def __init__(self, name: str, max_spans: int = MAX_SPANS, **attributes):
+        self.started_at = time.time()
+        self.max_spans = max_spans
+        self.spans = 1
+        self.dropped = 0
+        self.root = Span(name, {k: str(v) for k, v in attributes.items()}, self)
+
+    # (count, total seconds, max seconds) per span path, e.g. "daily_fanout/sheet/sheets.get_all_values"
+    def summary(self) -> Dict[str, Tuple[int, float, float]]:
+        totals: Dict[str, Tuple[int, float, float]] = {}
+
+        def visit(span: Span, prefix: str):
+            path = f"{prefix}/{span.name}" if prefix else span.name
+            count, total, longest = totals.get(path, (0, 0.0, 0.0))
+            totals[path] = (count + 1, total + span.duration, max(longest, span.duration))
+            for child in list(span.children):
+                visit(child, path)
+
+        visit(self.root, "")
+        return totals
+
+    def format_summary(self) -> str:
+        lines = [f"Trace {self.root.name}: {self.root.duration:.3f}s, {self.spans} spans"
+                 + (f" ({self.dropped} dropped)" if self.dropped else "")]
+        for path, (count, total, longest) in self.summary().items():
+            depth = path.count("/")
+            lines.append(f"{'  ' * depth}{path.rsplit('/', 1)[-1]}: {count}x, "
+                         f"total {total:.3f}s, avg {total / count:.3f}s, max {longest:.3f}s")
+        return "\n".join(lines)
+
+    def to_dict(self) -> dict:
+        return {
+            "started_at": self.started_at,
+            "duration": round(self.root.duration, 6),
+            "spans": self.spans,
+            "dropped": self.dropped,
+            "summary": {path: {"count": count, "total": round(total, 6), "max": round(longest, 6)}
+                        for path, (count, total, longest) in self.summary().items()},
+            "root": self.root.to_dict(),
+        }
+
+
+# Time the block as a child of the current span; a no-op outside a trace
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+
+    trace = parent.trace
+    if trace.spans >= trace.max_spans:
+        trace.dropped += 1
+        yield None
+        return
+
+    child = Span(name, {k: str(v) for k, v in attributes.items()}, trace)
+    trace.spans += 1
+    parent.children.append(child)
+    token = _current.set(child)
+    try:
+        yield child
+    finally:
+        child.end = time.perf_counter()
+        _current.reset(token)
+
+
+# Record the block as a new trace; it replaces the previous trace of that name
+@contextmanager
+def trace(name: str, **attributes) -> Iterator[Trace]:
+    run = Trace(name, **attributes)
+    token = _current.set(run.root)
+    try:
+        yield run
+    finally:
+        run.root.end = time.perf_counter()
+        _current.reset(token)
+        _last_traces[name] = run
+
+
+# The most recent finished trace of each run, by name
+def last_traces() -> Dict[str, Trace]:
+    return dict(_last_traces)
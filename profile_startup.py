@@ -0,0 +1,93 @@
+"""Where does the bot's startup time go?
+
+Imports a module (``main`` by default) in a fresh interpreter under
+``python -X importtime`` and reports the slowest imports, the total, and
+whether the heavy Google libraries were loaded. Run it after changing
+imports to check that cold start stays fast:
+
+    python profile_startup.py
+    python profile_startup.py --module bot.handler --top 30
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Modules that should only be imported on the first Sheets call
+HEAVY_MODULES = ("gspread", "google.auth", "google.oauth2", "googleapiclient")
+
+# The profile only imports; placeholders let settings parse without a real .env
+PLACEHOLDER_ENV = {
+    "BOT_TOKEN": "0:profile",
+    "SPREADSHEET_ID": "profile",
+    "SERVICE_ACCOUNT_PATH": "profile.json",
+}
+
+# Loaded after the import to report which heavy modules came along
+PROBE = "import sys, {module}; print('\\n'.join(sorted(sys.modules)))"
+
+
+# Import `module` under -X importtime; returns the loaded modules and the raw report
+def run_import(module: str) -> Tuple[List[str], str]:
+    env = dict(os.environ)
+    for name, value in PLACEHOLDER_ENV.items():
+        env.setdefault(name, value)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module)],
+        capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if result.returncode != 0:
+        print(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+        sys.exit(result.returncode)
+    return result.stdout.split(), result.stderr
+
+
+# Parse "import time: self [us] | cumulative | name" lines into (name, self, cumulative, depth)
+def parse_report(report: str) -> List[Tuple[str, int, int, int]]:
+    entries = []
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+# Self time summed per top-level package (what each dependency costs in total)
+def by_package(entries: List[Tuple[str, int, int, int]]) -> Dict[str, int]:
+    totals: Dict[str, int] = {}
+    for name, self_us, _, _ in entries:
+        package = name.split(".")[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time profile of the bot's startup")
+    parser.add_argument("--module", default="main", help="module to import (default: main)")
+    parser.add_argument("--top", type=int, default=15, help="rows to show per table")
+    args = parser.parse_args()
+
+    modules, report = run_import(args.module)
+    entries = parse_report(report)
+    outermost = min(depth for _, _, _, depth in entries)
+    total = sum(cumulative for _, _, cumulative, depth in entries if depth == outermost)
+
+    print(f"import {args.module}: {total / 1000:.0f} ms, {len(entries)} modules\n")
+
+    print("Slowest packages (self time of all their modules):")
+    for package, self_us in sorted(by_package(entries).items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+
+    print("\nSlowest single modules (self time):")
+    for name, self_us, _, _ in sorted(entries, key=lambda entry: -entry[1])[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {name}")
+
+    loaded = [name for name in HEAVY_MODULES if name in modules]
+    print(f"\nHeavy modules loaded at startup: {', '.join(loaded) if loaded else 'none'}")
+
+
+if __name__ == "__main__":
+    main()
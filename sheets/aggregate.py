@@ -0,0 +1,85 @@
+# Several worksheets, in one or more spreadsheets, read as a single roadmap
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from sheets.roadmap import MAX_RETRIES, RoadmapSnapshot
+from sheets.sources import SheetRef, parse_sources
+
+if TYPE_CHECKING:
+    from sheets.roadmap import RoadmapCache
+
+# Constants
+MAX_PARALLEL_FETCHES = 8  # sources of one aggregate loaded at once
+
+RoutedWrite = Tuple[RoadmapSnapshot, Dict[int, str], Dict[int, int]]  # source, {row: status}, {row: aggregate row}
+
+# Sources are loaded on their own pool: the caller is usually already running
+# on the Sheets executor, and waiting on that pool from inside it could deadlock
+_pool = ThreadPoolExecutor(max_workers=MAX_PARALLEL_FETCHES, thread_name_prefix="sheets-fetch")
+
+
+class AggregateSnapshot(RoadmapSnapshot):
+    """The tasks of several sheets, one after another, queried as one snapshot.
+
+    Rows are numbered across the aggregate (the first source's tasks from
+    row 2, then the next source's) and ``origin()`` maps each back to its
+    sheet and row there. Status writes are split per source and written to
+    each sheet (see ``route()``), so everything that takes a snapshot works
+    on an aggregate unchanged. Sources may have different columns; each task
+    keeps its own sheet's header.
+    """
+
+    def __init__(self, sources: List[Tuple[SheetRef, RoadmapSnapshot]]):
+        self.sources = sources
+        self.origins: List[Tuple[int, int]] = []  # per position: (source index, row in that source)
+        tasks = []
+        for index, (_, snapshot) in enumerate(sources):
+            for position, task in enumerate(snapshot.tasks):
+                tasks.append(task.schema.task(task.cells, len(tasks) + 2))
+                self.origins.append((index, position + 2))
+        first = sources[0][1] if sources else None
+        super().__init__(tasks, None, first.header if first else [], first.schema if first else None)
+        # Only says whether any source has a Status column; writes check each source's own
+        self.status_col = next((s.status_col for _, s in sources if s.status_col is not None), None)
+
+    # The sheet and row an aggregate row came from
+    def origin(self, row_number: int) -> Tuple[SheetRef, int]:
+        index, source_row = self.origins[row_number - 2]
+        return self.sources[index][0], source_row
+
+    # Split {aggregate row: status} per source sheet; rows of sources without a
+    # Status column are left out (and so never reported as written)
+    def route(self, changes: Dict[int, str]) -> List[RoutedWrite]:
+        parts: Dict[int, Tuple[Dict[int, str], Dict[int, int]]] = {}
+        for row_number, status in changes.items():
+            index, source_row = self.origins[row_number - 2]
+            if self.sources[index][1].status_col is None:
+                continue
+            part, rows = parts.setdefault(index, ({}, {}))
+            part[source_row] = status
+            rows[source_row] = row_number
+        return [(self.sources[index][1], part, rows) for index, (part, rows) in parts.items()]
+
+    def write_buffer(self):
+        raise TypeError("An aggregate roadmap is written through its sources; use route()")
+
+    def write_statuses(self, changes: Dict[int, str]) -> Dict[int, bool]:
+        outcome = {row_number: False for row_number in changes}
+        for source, part, rows in self.route(changes):
+            written = source.write_statuses(part)
+            outcome.update({row: written.get(source_row, False) for source_row, row in rows.items()})
+        self.apply_outcome(changes, outcome)
+        return outcome
+
+
+# Load every source through the cache at the same time, so an aggregate takes
+# about as long as its slowest sheet. Each source keeps its own cache entry
+# (and mirror or task store), shared with chats that read it alone
+def load_sources(cache: "RoadmapCache", sheet_name: str, max_retries: int = MAX_RETRIES,
+                 spreadsheet_id: Optional[str] = None) -> List[Tuple[SheetRef, RoadmapSnapshot]]:
+    refs = parse_sources(sheet_name, spreadsheet_id)
+    futures = [
+        _pool.submit(contextvars.copy_context().run, cache.get, worksheet, max_retries, source_spreadsheet_id)
+        for source_spreadsheet_id, worksheet in refs
+    ]
+    return [(ref, future.result()) for ref, future in zip(refs, futures)]
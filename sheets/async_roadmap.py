@@ -0,0 +1,114 @@
+# Non-blocking roadmap access for the bot's asyncio handlers
+import asyncio
+import contextvars
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Optional, TypeVar
+from metrics.instruments import record_sheets_retry
+from sheets.aggregate import AggregateSnapshot
+from sheets.client import is_stale_handle_error, is_transport_error
+from sheets.roadmap import (
+    MAX_RETRIES,
+    RETRY_DELAY,
+    RoadmapSnapshot,
+    get_roadmap_cache,
+    get_snapshot,
+)
+
+T = TypeVar("T")
+
+# Constants
+MAX_CONCURRENT_CALLS = 4  # Sheets requests in flight at once
+
+# gspread is synchronous, so every call runs on this pool instead of the event loop
+_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_CALLS, thread_name_prefix="sheets")
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        _semaphores[loop] = asyncio.Semaphore(MAX_CONCURRENT_CALLS)
+    return _semaphores[loop]
+
+
+# Run a blocking Sheets call on the executor, bounded by the semaphore; the
+# call runs in a copy of the caller's context so its spans join the caller's trace
+async def run_sheets_call(func: Callable[..., T], *args, **kwargs) -> T:
+    async with _semaphore():
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(_executor, partial(context.run, func, *args, **kwargs))
+
+
+# Retry a single-attempt call on google-auth's TransportError, backing off with
+# asyncio.sleep, and straight away after a stale handle (the failed attempt has
+# already rebuilt the client)
+async def call_with_retries(func: Callable[..., T], *args, description: str = "Google Sheets call",
+                            operation: str = "call") -> T:
+    for attempt in range(MAX_RETRIES):
+        try:
+            return await run_sheets_call(func, *args)
+        except Exception as e:
+            if is_transport_error(e) and attempt < MAX_RETRIES - 1:
+                wait_time = RETRY_DELAY * (2 ** attempt)
+                print(f"{description} failed: {e}. Retrying in {wait_time} seconds...")
+                record_sheets_retry(operation, wait_time)
+                await asyncio.sleep(wait_time)
+            elif is_stale_handle_error(e) and attempt < MAX_RETRIES - 1:
+                print(f"{description} failed: {e}. Retrying with a new client...")
+                record_sheets_retry(operation)
+            else:
+                raise
+
+
+# Get a (cached) snapshot without blocking the event loop
+async def load_snapshot_async(sheet_name: str = "ROADMAP", spreadsheet_id: Optional[str] = None) -> RoadmapSnapshot:
+    return await call_with_retries(
+        partial(get_snapshot, sheet_name, max_retries=1, spreadsheet_id=spreadsheet_id),
+        description="Fetching roadmap",
+        operation="load_snapshot",
+    )
+
+
+# Replay the task store's outbox to a sheet and refresh the store from it
+async def sync_store_async(sheet_name: str = "ROADMAP", spreadsheet_id: Optional[str] = None) -> int:
+    return await call_with_retries(
+        partial(get_roadmap_cache().sync_store, sheet_name, max_retries=1, spreadsheet_id=spreadsheet_id),
+        description="Syncing task store",
+        operation="sync_store",
+    )
+
+
+# Write {sheet row: status} in one batch and mirror the successful rows
+async def write_statuses_async(snapshot: RoadmapSnapshot, changes: Dict[int, str]) -> Dict[int, bool]:
+    if not changes:
+        return {}
+    if isinstance(snapshot, AggregateSnapshot):
+        return await write_aggregate_async(snapshot, changes)
+
+    buffer = snapshot.write_buffer()
+    try:
+        outcome = await call_with_retries(buffer.write_batch, changes, description="Writing statuses",
+                                           operation="batch_update")
+    except Exception as e:
+        print(f"Error writing statuses: {str(e)}")
+        outcome = {row: False for row in changes}
+
+    snapshot.apply_outcome(changes, outcome)
+    return outcome
+
+
+# Write an aggregate's changes to each source sheet at the same time and
+# mirror the rows every source reported as written
+async def write_aggregate_async(snapshot: AggregateSnapshot, changes: Dict[int, str]) -> Dict[int, bool]:
+    routed = snapshot.route(changes)
+    written = await asyncio.gather(*[write_statuses_async(source, part) for source, part, _ in routed])
+
+    outcome = {row_number: False for row_number in changes}
+    for (_, _, rows), source_outcome in zip(routed, written):
+        outcome.update({row: source_outcome.get(source_row, False) for source_row, row in rows.items()})
+    snapshot.apply_outcome(changes, outcome)
+    return outcome
+
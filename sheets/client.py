@@ -0,0 +1,151 @@
+# Process-wide Google Sheets client. gspread and google-auth take a few hundred
+# milliseconds to import, so they are imported on the first Sheets call, not at startup
+import os
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import gspread
+    from google.oauth2.service_account import Credentials
+    from google.auth.transport.requests import AuthorizedSession
+
+# Constants
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+DRIVE_METADATA_SCOPE = 'https://www.googleapis.com/auth/drive.metadata.readonly'  # for modifiedTime checks
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)  # refresh this long before the token expires
+POOL_SIZE = 10  # keep-alive connections kept open to Google
+
+
+class SheetsClientManager:
+    """Keeps one authorized gspread client and the worksheet handles it opened.
+
+    Credentials are read and authorized once; the underlying requests session
+    keeps a pool of keep-alive connections, the access token is refreshed
+    ahead of expiry, and worksheet handles are reused until an auth or
+    not-found error says they are stale. With ``service_account_info`` (the
+    parsed key JSON) the key is used from memory and no file is read.
+    """
+
+    def __init__(self, service_account_path: Optional[str], scopes: Optional[List[str]] = None,
+                 service_account_info: Optional[dict] = None):
+        self.service_account_path = service_account_path
+        self.service_account_info = service_account_info
+        self.scopes = scopes or SCOPES
+        self._lock = threading.RLock()
+        self._creds: Optional["Credentials"] = None
+        self._session: Optional["AuthorizedSession"] = None
+        self._client: Optional["gspread.Client"] = None
+        self._spreadsheets: Dict[str, "gspread.Spreadsheet"] = {}
+        self._worksheets: Dict[Tuple[str, str], "gspread.Worksheet"] = {}
+
+    def worksheet(self, spreadsheet_id: str, sheet_name: str) -> "gspread.Worksheet":
+        with self._lock:
+            client = self._authorized_client()
+            self._refresh_token_if_needed()
+
+            key = (spreadsheet_id, sheet_name)
+            if key not in self._worksheets:
+                if spreadsheet_id not in self._spreadsheets:
+                    self._spreadsheets[spreadsheet_id] = client.open_by_key(spreadsheet_id)
+                self._worksheets[key] = self._spreadsheets[spreadsheet_id].worksheet(sheet_name)
+            return self._worksheets[key]
+
+    # Drop cached handles; with reauthorize=True also rebuild credentials and session
+    def invalidate(self, spreadsheet_id: Optional[str] = None, sheet_name: Optional[str] = None,
+                   reauthorize: bool = False):
+        with self._lock:
+            if reauthorize or spreadsheet_id is None:
+                self._spreadsheets.clear()
+                self._worksheets.clear()
+            else:
+                if sheet_name is None:
+                    self._spreadsheets.pop(spreadsheet_id, None)
+                for key in list(self._worksheets):
+                    if key[0] == spreadsheet_id and (sheet_name is None or key[1] == sheet_name):
+                        del self._worksheets[key]
+
+            if reauthorize:
+                if self._session is not None:
+                    self._session.close()
+                self._creds = None
+                self._session = None
+                self._client = None
+
+    def _authorized_client(self) -> "gspread.Client":
+        if self._client is not None:
+            return self._client
+
+        # Verify that the service account file exists
+        if self.service_account_info is None and not os.path.exists(self.service_account_path or ""):
+            raise FileNotFoundError(f"Service account file not found at {self.service_account_path}")
+
+        import gspread
+        from google.auth.transport.requests import AuthorizedSession
+        from google.oauth2.service_account import Credentials
+        from requests.adapters import HTTPAdapter
+
+        if self.service_account_info is not None:
+            self._creds = Credentials.from_service_account_info(self.service_account_info, scopes=self.scopes)
+        else:
+            self._creds = Credentials.from_service_account_file(self.service_account_path, scopes=self.scopes)
+        self._session = AuthorizedSession(self._creds)
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self._session.mount("https://", adapter)
+        self._client = gspread.Client(auth=self._creds, session=self._session)
+        return self._client
+
+    # Mint a new access token before the current one runs out
+    def _refresh_token_if_needed(self):
+        expiry = self._creds.expiry  # naive UTC, None before the first refresh
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        if self._creds.token is None or expiry is None or expiry - now < TOKEN_REFRESH_MARGIN:
+            from google.auth.transport.requests import Request
+            self._creds.refresh(Request(self._session))
+
+
+# Errors after which a cached handle (or the credentials behind it) must be rebuilt.
+# Checked against sys.modules: if gspread/google-auth were never imported, the
+# error cannot be one of theirs, and the check stays free on the event loop
+def is_stale_handle_error(error: Exception) -> bool:
+    auth = sys.modules.get("google.auth.exceptions")
+    if auth is not None and isinstance(error, auth.RefreshError):
+        return True
+    exceptions = sys.modules.get("gspread.exceptions")
+    if exceptions is None:
+        return False
+    if isinstance(error, (exceptions.SpreadsheetNotFound, exceptions.WorksheetNotFound)):
+        return True
+    if isinstance(error, exceptions.APIError):
+        return error.code in (401, 403, 404)
+    return False
+
+
+# A network-level failure talking to Google (worth retrying); same lazy check
+def is_transport_error(error: Exception) -> bool:
+    auth = sys.modules.get("google.auth.exceptions")
+    return auth is not None and isinstance(error, auth.TransportError)
+
+
+_manager: Optional[SheetsClientManager] = None
+_manager_lock = threading.Lock()
+
+
+# Get the shared client manager, creating it on first use
+def get_client_manager() -> SheetsClientManager:
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            from config.settings import get_settings
+            settings = get_settings()
+            scopes = SCOPES + [DRIVE_METADATA_SCOPE] if settings.roadmap_cache_validate else SCOPES
+            _manager = SheetsClientManager(settings.service_account_path, scopes, settings.service_account_info)
+        return _manager
+
+
+# Replace the shared client manager (used by benchmarks and local fakes)
+def set_client_manager(manager: Optional[SheetsClientManager]):
+    global _manager
+    with _manager_lock:
+        _manager = manager
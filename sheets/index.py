@@ -0,0 +1,96 @@
+# In-memory lookups over one load of the roadmap
+from array import array
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import compress
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+if TYPE_CHECKING:
+    from sheets.task import Task
+
+DATE_FORMAT = "%d-%m-%Y"
+NO_DAY = 0  # day ordinal of a missing or unparseable date (real ordinals start at 1)
+
+# Status column as small integers, so whole-sheet passes compare ints
+PENDING, DONE, MISSED, OTHER = 1, 2, 3, 4
+_STATUS_CODES = {"Pending": PENDING, "Done": DONE, "Missed": MISSED}
+_PENDING_MASK = bytes(code == PENDING for code in range(256))  # bytes.translate table: 1 for Pending
+
+
+# Parse a sheet date once; roadmaps repeat the same few hundred dates
+@lru_cache(maxsize=4096)
+def parse_date(value: str) -> Optional[date]:
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, DATE_FORMAT).date()
+    except ValueError:
+        return None
+
+
+class TaskIndex:
+    """Task positions keyed by task key, start date and deadline, plus the
+    Start Date, Deadline and Status columns as flat arrays.
+
+    Built once per sheet load so lookups stay O(1) (or O(k) in the number of
+    matches) however long the roadmap grows. Dates are stored as day
+    ordinals and statuses as byte codes, so a daily run's transitions come
+    from C-level passes over the columns plus a check of the Pending rows,
+    not a date parse and comparison per row. Positions are indexes into
+    the task list; sheet row numbers are position + 2.
+    """
+
+    def __init__(self, tasks: List["Task"]):
+        self.row_by_key: Dict[str, int] = {}
+        self.by_start: Dict[int, List[int]] = {}
+        self.by_deadline: Dict[int, List[int]] = {}
+        self.start = array("l", [NO_DAY]) * len(tasks)
+        self.deadline = array("l", [NO_DAY]) * len(tasks)
+        self.status = bytearray(len(tasks))
+
+        for i, task in enumerate(tasks):
+            self.row_by_key.setdefault(task.key, i + 2)  # first match wins, as the old scan did
+            self.status[i] = _STATUS_CODES.get(task.status, OTHER)
+
+            if task.start is not None:
+                start = self.start[i] = task.start.toordinal()
+                self.by_start.setdefault(start, []).append(i)
+
+            if task.deadline is not None:
+                deadline = self.deadline[i] = task.deadline.toordinal()
+                self.by_deadline.setdefault(deadline, []).append(i)
+
+    def starting_on(self, day: date) -> List[int]:
+        return self.by_start.get(day.toordinal(), [])
+
+    def due_on(self, day: date) -> List[int]:
+        return self.by_deadline.get(day.toordinal(), [])
+
+    # Pending positions whose start date is before `today` (a date or datetime;
+    # only its calendar day counts), in sheet order. The Pending rows are picked
+    # out of the status column in C (translate + compress), so only they reach
+    # the date check
+    def overdue_pending(self, today: date) -> List[int]:
+        today = today.toordinal()
+        start = self.start
+        pending = compress(range(len(self.status)), self.status.translate(_PENDING_MASK))
+        return [i for i in pending if NO_DAY < start[i] < today]
+
+    # {position: new status} for a daily run: Pending rows that started before
+    # `today` become Missed, rows starting on `pending_days` become Pending and
+    # rows starting on `missed_days` become Missed. Done rows are left alone,
+    # and rows already at their new status are not returned
+    def transitions(self, today: date, pending_days: Iterable[date] = (),
+                    missed_days: Iterable[date] = ()) -> Dict[int, str]:
+        targets = {i: (MISSED, "Missed") for i in self.overdue_pending(today)}
+        for days, target in ((missed_days, (MISSED, "Missed")), (pending_days, (PENDING, "Pending"))):
+            for day in days:
+                for i in self.by_start.get(day.toordinal(), []):
+                    targets[i] = target
+        return {i: status for i, (code, status) in targets.items()
+                if self.status[i] != DONE and self.status[i] != code}
+
+    # Keep the status column in line with a status change
+    def set_status(self, position: int, new_status: str):
+        self.status[position] = _STATUS_CODES.get(new_status.strip(), OTHER)
@@ -1,147 +1,605 @@
-from datetime import datetime
-import gspread
+from datetime import date
+import threading
 import time
-import os
-from google.oauth2.service_account import Credentials
-from google.auth.exceptions import TransportError
-from typing import List, Dict, Tuple
+from metrics.instruments import record_sheets_retry, sheets_call
+from sheets.client import get_client_manager, is_stale_handle_error
+from sheets.sources import is_aggregate, parse_sources, sheet_key
+from sheets.index import TaskIndex, parse_date
+from sheets.task import Task, TaskSchema, resolve_schema
+from typing import TYPE_CHECKING, List, Dict, Iterable, Mapping, Tuple, Optional, Callable, TypeVar
+
+# gspread and google-auth are imported by the functions that call Sheets, so
+# importing this module (and starting the bot) does not pay for them
+if TYPE_CHECKING:
+    import gspread
 
 # Constants
-DATE_FORMAT = "%d-%m-%Y"
 MAX_RETRIES = 3
 RETRY_DELAY = 2  # seconds
 
-# Load Google Sheets client with retry logic
-def get_sheet(sheet_name: str = "ROADMAP") -> gspread.Worksheet:
-    from config.settings import SERVICE_ACCOUNT_PATH, SPREADSHEET_ID
+T = TypeVar("T")
 
-    # Verify that the service account file exists
-    if not os.path.exists(SERVICE_ACCOUNT_PATH):
-        raise FileNotFoundError(f"Service account file not found at {SERVICE_ACCOUNT_PATH}")
+# Load the worksheet handle from the shared client, with retry logic
+def get_sheet(sheet_name: str = "ROADMAP", max_retries: int = MAX_RETRIES,
+              spreadsheet_id: Optional[str] = None) -> "gspread.Worksheet":
+    import gspread
+    from google.auth.exceptions import TransportError
+    from config.settings import SPREADSHEET_ID
+    spreadsheet_id = spreadsheet_id or SPREADSHEET_ID
+    manager = get_client_manager()
 
     # Retry logic for network issues
-    for attempt in range(MAX_RETRIES):
+    for attempt in range(max_retries):
         try:
-            scope = ['https://www.googleapis.com/auth/spreadsheets']
-            creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_PATH, scopes=scope)
-            client = gspread.authorize(creds)
-            sheet = client.open_by_key(SPREADSHEET_ID).worksheet(sheet_name)
-            return sheet
+            with sheets_call("get_sheet"):
+                return manager.worksheet(spreadsheet_id, sheet_name)
         except TransportError as e:
-            if attempt < MAX_RETRIES - 1:
+            if attempt < max_retries - 1:
                 wait_time = RETRY_DELAY * (2 ** attempt)  # Exponential backoff
                 print(f"Google Sheets connection error: {e}. Retrying in {wait_time} seconds...")
+                record_sheets_retry("get_sheet", wait_time)
                 time.sleep(wait_time)
             else:
                 raise
         except gspread.exceptions.SpreadsheetNotFound:
-            raise ValueError(f"Spreadsheet with ID {SPREADSHEET_ID} not found. Check your SPREADSHEET_ID in .env file.")
+            manager.invalidate(spreadsheet_id)
+            raise ValueError(f"Spreadsheet with ID {spreadsheet_id} not found. Check your SPREADSHEET_ID in .env file.")
         except gspread.exceptions.WorksheetNotFound:
+            manager.invalidate(spreadsheet_id, sheet_name)
             raise ValueError(f"Worksheet '{sheet_name}' not found in the spreadsheet.")
+        except FileNotFoundError:
+            raise
         except Exception as e:
+            # Expired or revoked credentials: rebuild the client and try again. On the
+            # last attempt the client is still rebuilt, and the error is raised as is
+            # so a caller retrying single attempts (call_with_retries) knows to retry
+            if is_stale_handle_error(e):
+                print(f"Google Sheets auth error: {e}. Re-authorizing...")
+                manager.invalidate(reauthorize=True)
+                if attempt < max_retries - 1:
+                    record_sheets_retry("get_sheet")
+                    continue
+                raise
             raise Exception(f"Error connecting to Google Sheets: {str(e)}")
 
 
-# Convert a row into a dictionary
-def row_to_dict(header: List[str], row: List[str]) -> Dict:
-    return {header[i]: row[i] if i < len(row) else "" for i in range(len(header))}
-
-
-# Fetch all tasks from the sheet
-def fetch_all_tasks() -> Tuple[List[Dict], gspread.Worksheet, List[str]]:
-    sheet = get_sheet()
+# Run a read against the worksheet, retrying network errors and stale handles
+# (max_retries=1 makes a single attempt and leaves backoff to the caller);
+# `operation` names the request in metrics
+def read_sheet(read: Callable[["gspread.Worksheet"], T], sheet_name: str = "ROADMAP", max_retries: int = MAX_RETRIES,
+               spreadsheet_id: Optional[str] = None, operation: str = "read") -> Tuple[T, "gspread.Worksheet"]:
+    from google.auth.exceptions import TransportError
+    sheet = get_sheet(sheet_name, max_retries, spreadsheet_id)
 
     # Retry logic for fetching data
-    for attempt in range(MAX_RETRIES):
+    for attempt in range(max_retries):
         try:
-            rows = sheet.get_all_values()
-            if not rows:
-                raise ValueError("No data found in the spreadsheet")
-
-            header = rows[0]
-            if not header:
-                raise ValueError("Header row is empty in the spreadsheet")
-
-            tasks = [row_to_dict(header, row) for row in rows[1:]]
-            return tasks, sheet, header
+            with sheets_call(operation):
+                return read(sheet), sheet
         except TransportError as e:
-            if attempt < MAX_RETRIES - 1:
+            if attempt < max_retries - 1:
                 wait_time = RETRY_DELAY * (2 ** attempt)
                 print(f"Error fetching data: {e}. Retrying in {wait_time} seconds...")
+                record_sheets_retry(operation, wait_time)
                 time.sleep(wait_time)
             else:
                 raise
         except Exception as e:
+            # The cached handle went stale (sheet renamed, token revoked): rebuild it,
+            # even on the last attempt so the next call does not reuse it
+            if is_stale_handle_error(e):
+                print(f"Stale worksheet handle: {e}. Reconnecting...")
+                get_client_manager().invalidate(reauthorize=True)
+                if attempt < max_retries - 1:
+                    record_sheets_retry(operation)
+                    sheet = get_sheet(sheet_name, max_retries, spreadsheet_id)
+                    continue
+                raise
             raise Exception(f"Error fetching data from spreadsheet: {str(e)}")
 
 
+# Every row of the sheet, header first
+def fetch_all_values(sheet: "gspread.Worksheet") -> List[List[str]]:
+    rows = sheet.get_all_values()
+    if not rows:
+        raise ValueError("No data found in the spreadsheet")
+    if not rows[0]:
+        raise ValueError("Header row is empty in the spreadsheet")
+    return rows
+
+
+# Header of each sheet as last read in full: (spreadsheet id, sheet name) -> schema
+_layouts: Dict[Tuple[Optional[str], str], TaskSchema] = {}
+
+
+# Forget the headers read so far (all, or one sheet's), so the next load reads in full
+def forget_layouts(sheet_name: Optional[str] = None, spreadsheet_id: Optional[str] = None):
+    if sheet_name is None:
+        _layouts.clear()
+    else:
+        _layouts.pop(sheet_key(spreadsheet_id, sheet_name), None)
+
+
+# Fetch all tasks from the sheet. The first load reads every cell and keeps
+# the header; later loads read the header row and only the TASK_COLUMNS of it
+# in one batchGet, and fall back to a full read if the header has changed
+def fetch_all_tasks(sheet_name: str = "ROADMAP", max_retries: int = MAX_RETRIES,
+                    spreadsheet_id: Optional[str] = None) -> Tuple[List[Task], "gspread.Worksheet", TaskSchema]:
+    key = sheet_key(spreadsheet_id, sheet_name)
+    layout = _layouts.get(key)
+    projection = layout.projection() if layout is not None else None
+    if projection is not None:
+        from sheets.sync import column_letter
+        ranges = ["1:1"] + [f"{column_letter(first + 1)}2:{column_letter(last + 1)}" for first, last in projection.runs]
+        results, sheet = read_sheet(lambda s: s.batch_get(ranges), sheet_name, max_retries, spreadsheet_id,
+                                    "batch_get")
+        if layout.matches(results[0][0] if results[0] else []):
+            return projection.tasks(projection.join(results[1:])), sheet, projection
+        print("Sheet header changed, downloading the whole sheet...")
+
+    rows, sheet = read_sheet(fetch_all_values, sheet_name, max_retries, spreadsheet_id, "get_all_values")
+    schema = resolve_schema(rows[0])
+    _layouts[key] = schema
+    return schema.tasks(rows[1:]), sheet, schema
+
+
+# Collect Status cell changes and write them in a single batch_update call
+class StatusWriteBuffer:
+    """Buffers status writes and flushes them as one values:batchUpdate request.
+
+    Use it as a context manager to flush at the end of an operation, or pass
+    ``window`` (seconds) to flush automatically once the first change has
+    waited that long; ``on_flush`` then receives the per-row outcome.
+    """
+
+    def __init__(self, sheet: "gspread.Worksheet", status_col: int, window: float = 0,
+                 on_flush: Optional[Callable[[Dict[int, bool]], None]] = None):
+        self.sheet = sheet
+        self.status_col = status_col
+        self.window = window
+        self.on_flush = on_flush
+        self.pending: Dict[int, str] = {}  # sheet row -> new status (last write wins)
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def __enter__(self) -> "StatusWriteBuffer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+
+    def add(self, row_number: int, new_status: str):
+        with self._lock:
+            self.pending[row_number] = new_status
+            if self.window > 0 and self._timer is None:
+                self._timer = threading.Timer(self.window, self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush_from_timer(self):
+        outcome = self.flush()
+        if self.on_flush:
+            self.on_flush(outcome)
+
+    # Take every buffered change, leaving the buffer empty
+    def drain(self) -> Dict[int, str]:
+        with self._lock:
+            changes, self.pending = self.pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        return changes
+
+    # Send one batch_update request for the given changes; raises on failure
+    def write_batch(self, changes: Dict[int, str]) -> Dict[int, bool]:
+        from gspread.utils import rowcol_to_a1
+        data = [
+            {"range": rowcol_to_a1(row, self.status_col), "values": [[status]]}
+            for row, status in sorted(changes.items())
+        ]
+        with sheets_call("batch_update"):
+            response = self.sheet.batch_update(data)
+        return self._outcome(changes, response)
+
+    # Write every buffered change; returns {sheet row: written?}
+    def flush(self) -> Dict[int, bool]:
+        changes = self.drain()
+        if not changes:
+            return {}
+
+        from google.auth.exceptions import TransportError
+        for attempt in range(MAX_RETRIES):
+            try:
+                return self.write_batch(changes)
+            except TransportError as e:
+                if attempt < MAX_RETRIES - 1:
+                    wait_time = RETRY_DELAY * (2 ** attempt)
+                    print(f"Error writing statuses: {e}. Retrying in {wait_time} seconds...")
+                    record_sheets_retry("batch_update", wait_time)
+                    time.sleep(wait_time)
+                else:
+                    print(f"Error writing statuses: {e}. Giving up on {len(changes)} rows")
+            except Exception as e:
+                print(f"Error writing statuses: {str(e)}")
+                break
+
+        return {row: False for row in changes}
+
+    # Match the updated ranges reported by the API back to sheet rows
+    @staticmethod
+    def _outcome(changes: Dict[int, str], response) -> Dict[int, bool]:
+        responses = response.get("responses") if isinstance(response, dict) else None
+        if responses is None:
+            return {row: True for row in changes}
+
+        from gspread.utils import a1_to_rowcol
+        updated = set()
+        for item in responses:
+            updated_range = item.get("updatedRange", "")
+            if updated_range:
+                cell = updated_range.split("!")[-1].split(":")[0]
+                updated.add(a1_to_rowcol(cell)[0])
+        return {row: row in updated for row in changes}
+
+
+# One read of the roadmap sheet, queried from memory
+class RoadmapSnapshot:
+    """Tasks loaded with a single get_all_values() call.
+
+    Every step of a daily run (missed marking, today's tasks and deadlines,
+    status updates) can share one snapshot instead of re-downloading the
+    sheet. Writes made through the helpers below are mirrored into the
+    snapshot so later steps see them.
+    """
+
+    def __init__(self, tasks: List[Task], sheet: "gspread.Worksheet", header: List[str],
+                 schema: Optional[TaskSchema] = None):
+        self.tasks = tasks
+        self.sheet = sheet
+        self.header = header
+        self.schema = schema or resolve_schema(header)
+        self.status_col = self.schema.sheet_column("Status")  # 1-indexed, in the sheet
+        self.index = TaskIndex(tasks)
+        self.version = 0  # bumped on every status change, so copies built from it can tell
+
+    @classmethod
+    def load(cls, sheet_name: str = "ROADMAP", max_retries: int = MAX_RETRIES,
+             spreadsheet_id: Optional[str] = None) -> "RoadmapSnapshot":
+        tasks, sheet, schema = fetch_all_tasks(sheet_name, max_retries, spreadsheet_id)
+        return cls(tasks, sheet, schema.header, schema)
+
+    def today_tasks(self, today: str) -> List[Task]:
+        day = parse_date(today)
+        if day is None:
+            return [t for t in self.tasks if t.get("Start Date") == today]
+        return [self.tasks[i] for i in self.index.starting_on(day)]
+
+    def today_deadlines(self, today: str) -> List[Task]:
+        day = parse_date(today)
+        if day is None:
+            return [t for t in self.tasks if t.get("Deadline") == today]
+        return [self.tasks[i] for i in self.index.due_on(day)]
+
+    # Pending tasks that started before today's date, as (sheet row, task) pairs
+    def overdue_pending(self, today: date) -> List[Tuple[int, Task]]:
+        return [(i + 2, self.tasks[i]) for i in self.index.overdue_pending(today)]  # +2 for header offset
+
+    # Every status cell a daily run changes, as {sheet row: status}; see TaskIndex.transitions
+    def status_changes(self, today: date, pending_days: Iterable[date] = (),
+                       missed_days: Iterable[date] = ()) -> Dict[int, str]:
+        changes = self.index.transitions(today, pending_days, missed_days)
+        return {i + 2: status for i, status in sorted(changes.items())}  # +2 for header offset
+
+    # Sheet row number (1-indexed, header included) of a task, if present
+    def find_row(self, start_date: str, topic: str) -> Optional[int]:
+        return self.index.row_by_key.get(f"{start_date}::{topic}")
+
+    # Keep the in-memory copy in line with a status written to the sheet
+    def set_status(self, row_number: int, new_status: str):
+        self.tasks[row_number - 2]["Status"] = new_status
+        self.index.set_status(row_number - 2, new_status)
+        self.version += 1
+
+    # Sheet rows of the given (Start Date, Topic) pairs, keyed by task key
+    def rows_for_keys(self, keys: List[Tuple[str, str]]) -> Dict[str, int]:
+        rows = {}
+        for start_date, topic in keys:
+            row_number = self.find_row(start_date, topic)
+            if row_number is None:
+                print(f"Task not found: {start_date}::{topic}")
+                continue
+            rows[f"{start_date}::{topic}"] = row_number
+        return rows
+
+    def write_buffer(self) -> StatusWriteBuffer:
+        return StatusWriteBuffer(self.sheet, self.status_col)
+
+    # Mirror the rows a batch write reported as written
+    def apply_outcome(self, changes: Dict[int, str], outcome: Dict[int, bool]):
+        for row_number, written in outcome.items():
+            if written:
+                self.set_status(row_number, changes[row_number])
+
+    # Write {sheet row: status} in one batch and mirror the successful rows
+    def write_statuses(self, changes: Dict[int, str]) -> Dict[int, bool]:
+        buffer = self.write_buffer()
+        for row_number, new_status in changes.items():
+            buffer.add(row_number, new_status)
+
+        outcome = buffer.flush()
+        self.apply_outcome(changes, outcome)
+        return outcome
+
+
+# Read-through cache of roadmap snapshots shared by commands, buttons and jobs
+class RoadmapCache:
+    """Reuses a loaded snapshot for ``ttl`` seconds.
+
+    The bot's own status writes are mirrored into the cached snapshot
+    (write-through), so only edits made in the sheet itself can make it stale.
+    With ``validate=True`` an expired entry first compares the spreadsheet's
+    Drive ``modifiedTime`` and is kept if nothing changed, which costs a small
+    metadata request instead of a full download. With ``incremental=True``
+    reloads go through a RoadmapMirror (sheets/sync.py) that re-reads only
+    the columns and rows that changed. With a ``store`` (sheets/store.py)
+    snapshots are read from the local task store and the sheet is only read
+    by ``sync_store()``.
+    """
+
+    def __init__(self, ttl: float, validate: bool = False, incremental: bool = False,
+                 store: Optional["TaskStore"] = None):
+        self.ttl = ttl
+        self.validate = validate and store is None  # the store's copy changes without a sheet edit
+        self.incremental = incremental
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.revalidations = 0
+        # (spreadsheet id, sheet name), see sheet_key() -> (snapshot, loaded at, modifiedTime)
+        self._entries: Dict[Tuple[Optional[str], str], Tuple[RoadmapSnapshot, float, Optional[str]]] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[Tuple[Optional[str], str], threading.Lock] = {}
+        self._mirrors: Dict[Tuple[Optional[str], str], "RoadmapMirror"] = {}
+        # aggregate name -> (source snapshot ids and versions, merged snapshot)
+        self._aggregates: Dict[Tuple[Optional[str], str], Tuple[List[Tuple[int, int]], RoadmapSnapshot]] = {}
+
+    def get(self, sheet_name: str = "ROADMAP", max_retries: int = MAX_RETRIES,
+            spreadsheet_id: Optional[str] = None) -> RoadmapSnapshot:
+        if is_aggregate(sheet_name):
+            return self._get_aggregate(sheet_name, max_retries, spreadsheet_id)
+        key = sheet_key(spreadsheet_id, sheet_name)
+
+        # One load per sheet at a time; concurrent callers wait and share it
+        with self._load_lock(key):
+            entry = self._entries.get(key)
+            if entry is not None:
+                snapshot, loaded_at, modified_time = entry
+                if time.monotonic() - loaded_at < self.ttl:
+                    self.hits += 1
+                    return snapshot
+                if self.validate and modified_time is not None and \
+                        self._modified_time(snapshot.sheet) == modified_time:
+                    self.revalidations += 1
+                    self.hits += 1
+                    self._entries[key] = (snapshot, time.monotonic(), modified_time)
+                    return snapshot
+                self.refreshes += 1
+            else:
+                self.misses += 1
+
+            snapshot = self._load(key, max_retries)
+            modified_time = self._modified_time(snapshot.sheet) if self.validate else None
+            self._entries[key] = (snapshot, time.monotonic(), modified_time)
+            return snapshot
+
+    # Several sheets as one (sheets/aggregate.py): the sources are loaded in
+    # parallel through their own entries, and the merged snapshot is reused
+    # until one of them is reloaded or has a status changed
+    def _get_aggregate(self, sheet_name: str, max_retries: int, spreadsheet_id: Optional[str]) -> RoadmapSnapshot:
+        from sheets.aggregate import AggregateSnapshot, load_sources
+        key = sheet_key(spreadsheet_id, sheet_name)
+        sources = load_sources(self, sheet_name, max_retries, key[0])
+        signature = [(id(snapshot), snapshot.version) for _, snapshot in sources]
+        with self._lock:
+            cached = self._aggregates.get(key)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+        aggregate = AggregateSnapshot(sources)
+        with self._lock:
+            self._aggregates[key] = (signature, aggregate)
+        return aggregate
+
+    def _load_lock(self, key: Tuple[Optional[str], str]) -> threading.Lock:
+        with self._lock:
+            return self._load_locks.setdefault(key, threading.Lock())
+
+    def _load(self, key: Tuple[Optional[str], str], max_retries: int) -> RoadmapSnapshot:
+        if self.store is None:
+            return self._load_from_sheet(key, max_retries)
+
+        snapshot = self.store.snapshot(key)
+        if snapshot is None:
+            # First use of this sheet: fill the store before answering from it
+            self.store.sync(key, lambda: self._load_from_sheet(key, max_retries))
+            snapshot = self.store.snapshot(key)
+        return snapshot
+
+    def _load_from_sheet(self, key: Tuple[Optional[str], str], max_retries: int) -> RoadmapSnapshot:
+        spreadsheet_id, sheet_name = key
+        if not self.incremental:
+            return RoadmapSnapshot.load(sheet_name, max_retries, spreadsheet_id)
+
+        from sheets.sync import RoadmapMirror
+        with self._lock:
+            mirror = self._mirrors.setdefault(key, RoadmapMirror(sheet_name, spreadsheet_id))
+        return mirror.snapshot(max_retries)
+
+    # Replay the task store's outbox to one sheet and refresh the store from it;
+    # returns the number of status changes written to the sheet
+    def sync_store(self, sheet_name: str = "ROADMAP", max_retries: int = MAX_RETRIES,
+                   spreadsheet_id: Optional[str] = None) -> int:
+        if is_aggregate(sheet_name):
+            return sum(self.sync_store(source_sheet, max_retries, source_spreadsheet_id)
+                       for source_spreadsheet_id, source_sheet in parse_sources(sheet_name, spreadsheet_id))
+        key = sheet_key(spreadsheet_id, sheet_name)
+        with self._load_lock(key):
+            written = self.store.sync(key, lambda: self._load_from_sheet(key, max_retries))
+
+        # The next read picks up the refreshed rows
+        with self._lock:
+            self._entries.pop(key, None)
+        return written
+
+    # Forget one sheet (or every sheet) so the next read downloads it again
+    def invalidate(self, sheet_name: Optional[str] = None, spreadsheet_id: Optional[str] = None):
+        with self._lock:
+            if sheet_name is None:
+                self._entries.clear()
+                self._mirrors.clear()
+                self._aggregates.clear()
+                forget_layouts()
+            else:
+                self._aggregates.pop(sheet_key(spreadsheet_id, sheet_name), None)
+                for source in parse_sources(sheet_name, spreadsheet_id):
+                    key = sheet_key(*source)
+                    self._entries.pop(key, None)
+                    self._mirrors.pop(key, None)
+                    forget_layouts(key[1], key[0])
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            mirrors = list(self._mirrors.values())
+        stats = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "revalidations": self.revalidations,
+            "full_syncs": sum(m.full_syncs for m in mirrors),
+            "incremental_syncs": sum(m.incremental_syncs for m in mirrors),
+        }
+        if self.store is not None:
+            stats.update({f"store_{name}": value for name, value in self.store.stats().items()})
+        return stats
+
+    @staticmethod
+    def _modified_time(sheet: "gspread.Worksheet") -> Optional[str]:
+        try:
+            with sheets_call("get_last_update_time"):
+                return sheet.spreadsheet.get_lastUpdateTime()
+        except Exception as e:
+            print(f"Could not read the spreadsheet's modifiedTime: {str(e)}")
+            return None
+
+
+_cache: Optional[RoadmapCache] = None
+_cache_lock = threading.Lock()
+
+
+# Get the shared roadmap cache, configured from settings on first use
+def get_roadmap_cache() -> RoadmapCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            from config.settings import ROADMAP_CACHE_TTL, ROADMAP_CACHE_VALIDATE, ROADMAP_SYNC, TASK_STORE_PATH
+            store = None
+            if TASK_STORE_PATH:
+                from sheets.store import TaskStore
+                store = TaskStore(TASK_STORE_PATH)
+            _cache = RoadmapCache(ROADMAP_CACHE_TTL, ROADMAP_CACHE_VALIDATE, ROADMAP_SYNC == "incremental", store)
+        return _cache
+
+
+# Current snapshot of the roadmap, served from the cache when fresh
+def get_snapshot(sheet_name: str = "ROADMAP", max_retries: int = MAX_RETRIES,
+                 spreadsheet_id: Optional[str] = None) -> RoadmapSnapshot:
+    return get_roadmap_cache().get(sheet_name, max_retries, spreadsheet_id)
+
+
 # Get tasks starting today
-def get_today_tasks(today: str) -> List[Dict]:
-    tasks, _, _ = fetch_all_tasks()
-    return [t for t in tasks if t.get("Start Date") == today]
+def get_today_tasks(today: str, snapshot: Optional[RoadmapSnapshot] = None) -> List[Task]:
+    snapshot = snapshot or get_snapshot()
+    return snapshot.today_tasks(today)
 
 
 # Get tasks with deadline today
-def get_today_deadlines(today: str) -> List[Dict]:
-    tasks, _, _ = fetch_all_tasks()
-    return [t for t in tasks if t.get("Deadline") == today]
+def get_today_deadlines(today: str, snapshot: Optional[RoadmapSnapshot] = None) -> List[Task]:
+    snapshot = snapshot or get_snapshot()
+    return snapshot.today_deadlines(today)
 
 
 # Mark previous pending tasks as missed
-def mark_previous_pending_as_missed(today: datetime):
-    tasks, sheet, header = fetch_all_tasks()
-    status_col = header.index("Status") + 1  # 1-indexed
+def mark_previous_pending_as_missed(today: date, snapshot: Optional[RoadmapSnapshot] = None) -> Dict[int, bool]:
+    snapshot = snapshot or get_snapshot()
+    if snapshot.status_col is None:
+        print(f"Error: 'Status' column not found in spreadsheet")
+        return {}
 
     print("⚠️ Marking previous 'Pending' tasks as 'Missed'...")
 
-    for i, row in enumerate(tasks):
-        try:
-            start_date_str = row.get("Start Date", "")
-            status = row.get("Status", "").strip()
+    overdue = snapshot.overdue_pending(today)
+    outcome = snapshot.write_statuses({row_number: "Missed" for row_number, _ in overdue})
+    report_missed(overdue, outcome)
+    return outcome
 
-            if not start_date_str or status != "Pending":
-                continue
 
-            start_date = datetime.strptime(start_date_str, DATE_FORMAT)
-            if start_date < today:
-                sheet.update_cell(i + 2, status_col, "Missed")  # +2 for header offset
-                print(f"  - Marked '{row.get('Topic')}' as Missed (was Pending)")
-        except Exception as e:
-            print(f"  - Error processing task {i+1}: {str(e)}")
-            continue
+def report_missed(overdue: List[Tuple[int, Task]], outcome: Dict[int, bool]):
+    for row_number, row in overdue:
+        if outcome.get(row_number):
+            print(f"  - Marked '{row.get('Topic')}' as Missed (was Pending)")
+        else:
+            print(f"  - Error processing task {row_number - 1}: status not written")
 
 
-# Update task status
-def update_task_status(start_date: str, topic: str, new_status: str) -> bool:
+def report_status_changes(snapshot: RoadmapSnapshot, changes: Dict[int, str], outcome: Dict[int, bool]):
+    for row_number, status in changes.items():
+        if outcome.get(row_number):
+            print(f"  - Marked '{snapshot.tasks[row_number - 2].get('Topic')}' as {status}")
+        else:
+            print(f"  - Error processing task {row_number - 1}: status not written")
+
+
+# Update the status of several tasks in one write; returns {task key: updated?}
+def update_task_statuses(keys: List[Tuple[str, str]], new_status: str,
+                         snapshot: Optional[RoadmapSnapshot] = None) -> Dict[str, bool]:
+    results = {f"{start_date}::{topic}": False for start_date, topic in keys}
     try:
-        tasks, sheet, header = fetch_all_tasks()
+        snapshot = snapshot or get_snapshot()
 
         # Make sure Status column exists
-        try:
-            status_col = header.index("Status") + 1
-        except ValueError:
+        if snapshot.status_col is None:
             print(f"Error: 'Status' column not found in spreadsheet")
-            return False
-
-        # Find and update the matching task
-        for i, row in enumerate(tasks):
-            if row.get("Start Date") == start_date and row.get("Topic") == topic:
-                try:
-                    sheet.update_cell(i + 2, status_col, new_status)
-                    print(f"✅ Marking first task as {new_status} → {start_date}::{topic}")
-                    return True
-                except Exception as e:
-                    print(f"Error updating cell: {str(e)}")
-                    return False
-
-        print(f"Task not found: {start_date}::{topic}")
-        return False
+            return results
+
+        # Find the matching tasks and write them together
+        rows = snapshot.rows_for_keys(keys)
+        outcome = snapshot.write_statuses({row_number: new_status for row_number in rows.values()})
+        report_status_updates(results, rows, outcome, new_status)
+        return results
 
     except Exception as e:
-        print(f"Error in update_task_status: {str(e)}")
-        return False
+        print(f"Error in update_task_statuses: {str(e)}")
+        return results
+
+
+# Fill {task key: updated?} from a batch write outcome
+def report_status_updates(results: Dict[str, bool], rows: Dict[str, int],
+                          outcome: Dict[int, bool], new_status: str):
+    for key, row_number in rows.items():
+        results[key] = outcome.get(row_number, False)
+        if results[key]:
+            print(f"✅ Marking task as {new_status} → {key}")
+        else:
+            print(f"Error updating cell for {key}")
+
+
+# Update task status
+def update_task_status(start_date: str, topic: str, new_status: str,
+                       snapshot: Optional[RoadmapSnapshot] = None) -> bool:
+    results = update_task_statuses([(start_date, topic)], new_status, snapshot)
+    return results[f"{start_date}::{topic}"]
 
 
 # Helper: Generate unique key
-def task_key(task: Dict):
+def task_key(task: Mapping[str, str]) -> str:
     return f"{task.get('Start Date')}::{task.get('Topic')}"
@@ -0,0 +1,39 @@
+# Worksheet names that list several sheets to read as one roadmap
+import re
+from typing import List, Optional, Tuple
+
+# Constants
+SOURCE_SEPARATOR = ","  # "ROADMAP,Team B" reads both tabs as one roadmap
+
+SheetRef = Tuple[Optional[str], str]  # (spreadsheet id or None for the configured one, worksheet)
+
+_SPREADSHEET_ID = re.compile(r"^[A-Za-z0-9_-]{25,}$")
+
+
+# The key a sheet is cached under: None means the configured SPREADSHEET_ID, so
+# a sheet named with and without its id is still one entry
+def sheet_key(spreadsheet_id: Optional[str], sheet_name: str) -> Tuple[str, str]:
+    if spreadsheet_id is None:
+        from config.settings import SPREADSHEET_ID
+        spreadsheet_id = SPREADSHEET_ID
+    return spreadsheet_id, sheet_name
+
+
+# Whether a worksheet name lists several sources
+def is_aggregate(sheet_name: str) -> bool:
+    return SOURCE_SEPARATOR in sheet_name
+
+
+# The sheets a worksheet name lists: each entry is a tab of `spreadsheet_id`,
+# or "<spreadsheet id>/<tab>" for a tab of another spreadsheet
+def parse_sources(sheet_name: str, spreadsheet_id: Optional[str] = None) -> List[SheetRef]:
+    sources: List[SheetRef] = []
+    for entry in sheet_name.split(SOURCE_SEPARATOR):
+        entry = entry.strip()
+        if not entry:
+            continue
+        prefix, slash, tab = entry.partition("/")
+        source = (prefix, tab) if slash and tab and _SPREADSHEET_ID.match(prefix) else (spreadsheet_id, entry)
+        if source not in sources:
+            sources.append(source)
+    return sources
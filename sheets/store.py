@@ -0,0 +1,277 @@
+# Local SQLite copy of the roadmap: reads never wait on Google, and status
+# changes queue in an outbox that is replayed to the sheet in the background
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from sheets.roadmap import RoadmapSnapshot, StatusWriteBuffer
+from sheets.task import Task, resolve_schema
+
+# Constants
+SCHEMA_VERSION = 2  # 2: rows stored as cell lists instead of dicts
+MAX_OUTBOX_ATTEMPTS = 10  # a change the sheet keeps rejecting is dropped after this many syncs
+
+SheetKey = Tuple[str, str]  # (spreadsheet id, worksheet)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sheets (
+    spreadsheet_id TEXT NOT NULL,
+    sheet_name TEXT NOT NULL,
+    header TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (spreadsheet_id, sheet_name)
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    spreadsheet_id TEXT NOT NULL,
+    sheet_name TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    start_date TEXT NOT NULL,
+    start_day TEXT,
+    deadline TEXT NOT NULL,
+    deadline_day TEXT,
+    topic TEXT NOT NULL,
+    status TEXT NOT NULL,
+    cells TEXT NOT NULL,
+    PRIMARY KEY (spreadsheet_id, sheet_name, row)
+);
+CREATE INDEX IF NOT EXISTS tasks_by_start ON tasks (spreadsheet_id, sheet_name, start_day);
+CREATE INDEX IF NOT EXISTS tasks_by_deadline ON tasks (spreadsheet_id, sheet_name, deadline_day);
+CREATE INDEX IF NOT EXISTS tasks_by_status ON tasks (spreadsheet_id, sheet_name, status);
+CREATE INDEX IF NOT EXISTS tasks_by_key ON tasks (spreadsheet_id, sheet_name, start_date, topic);
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    spreadsheet_id TEXT NOT NULL,
+    sheet_name TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_by_sheet ON outbox (spreadsheet_id, sheet_name, id);
+"""
+
+
+class TaskStore:
+    """Tasks of every synced sheet in a local SQLite database.
+
+    ``sync()`` replays the outbox to the sheet and then replaces the local
+    rows with a fresh read. Status changes made through a StoreSnapshot land
+    in the tasks table and the outbox in one transaction, so they survive a
+    restart and are re-applied on top of any sheet read that predates them.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self._conn.executescript(SCHEMA)
+
+    # Local rows are only a copy of the sheet: an old layout is dropped and
+    # re-read on the next sync, while queued changes in the outbox are kept
+    def _migrate(self):
+        version, = self._conn.execute("PRAGMA user_version").fetchone()
+        if version < SCHEMA_VERSION:
+            with self._conn:
+                self._conn.execute("DROP TABLE IF EXISTS tasks")
+                self._conn.execute("DROP TABLE IF EXISTS sheets")
+                self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # Every sheet with local rows or queued changes
+    def sheets(self) -> List[SheetKey]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT spreadsheet_id, sheet_name FROM sheets"
+                " UNION SELECT spreadsheet_id, sheet_name FROM outbox"
+            ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def synced_at(self, key: SheetKey) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT synced_at FROM sheets WHERE spreadsheet_id = ? AND sheet_name = ?", key
+            ).fetchone()
+        return row[0] if row else None
+
+    # The local copy of a sheet, or None if it was never synced
+    def snapshot(self, key: SheetKey) -> Optional["StoreSnapshot"]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT header FROM sheets WHERE spreadsheet_id = ? AND sheet_name = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            data = self._conn.execute(
+                "SELECT cells FROM tasks WHERE spreadsheet_id = ? AND sheet_name = ? ORDER BY row", key
+            ).fetchall()
+        header = json.loads(row[0])
+        return StoreSnapshot(resolve_schema(header).tasks([json.loads(cells) for cells, in data]), header, self, key)
+
+    # Swap in a fresh read of the sheet, keeping changes the sheet has not received yet
+    def replace(self, key: SheetKey, header: List[str], tasks: List[Task]):
+        with self._lock, self._conn:
+            queued = {}
+            for start_date, topic, status in self._conn.execute(
+                    "SELECT start_date, topic, status FROM outbox"
+                    " WHERE spreadsheet_id = ? AND sheet_name = ? ORDER BY id", key):
+                queued[(start_date, topic)] = status  # last change wins
+
+            records = []
+            for i, task in enumerate(tasks):
+                task_id = (task.get("Start Date", ""), task.get("Topic", ""))
+                if task_id in queued:
+                    task = Task(task.schema, task.cells, task.row)
+                    task["Status"] = queued.pop(task_id)  # first row with the key, like TaskIndex
+                records.append(key + (
+                    i + 2,  # +2 for header offset
+                    task.get("Start Date", ""),
+                    task.start.isoformat() if task.start else None,
+                    task.get("Deadline", ""),
+                    task.deadline.isoformat() if task.deadline else None,
+                    task.get("Topic", ""),
+                    task.get("Status", ""),
+                    json.dumps(task.cells),
+                ))
+
+            self._conn.execute("DELETE FROM tasks WHERE spreadsheet_id = ? AND sheet_name = ?", key)
+            self._conn.executemany("INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", records)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sheets VALUES (?, ?, ?, ?)", key + (json.dumps(header), time.time())
+            )
+
+    # Write {sheet row: status} locally and queue it for the sheet; returns {sheet row: written?}
+    def set_statuses(self, key: SheetKey, changes: Dict[int, str], status_col: int) -> Dict[int, bool]:
+        outcome = {}
+        now = time.time()
+        with self._lock, self._conn:
+            for row_number, status in changes.items():
+                found = self._conn.execute(
+                    "SELECT start_date, topic, cells FROM tasks WHERE spreadsheet_id = ? AND sheet_name = ? AND row = ?",
+                    key + (row_number,),
+                ).fetchone()
+                if found is None:
+                    outcome[row_number] = False
+                    continue
+                start_date, topic, cells = found
+                cells = json.loads(cells)
+                cells.extend([""] * (status_col - len(cells)))
+                cells[status_col - 1] = status
+                self._conn.execute(
+                    "UPDATE tasks SET status = ?, cells = ? WHERE spreadsheet_id = ? AND sheet_name = ? AND row = ?",
+                    (status, json.dumps(cells)) + key + (row_number,),
+                )
+                self._conn.execute(
+                    "INSERT INTO outbox (spreadsheet_id, sheet_name, start_date, topic, status, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    key + (start_date, topic, status, now),
+                )
+                outcome[row_number] = True
+        return outcome
+
+    # Queued changes for a sheet, oldest first: [(id, start date, topic, status)]
+    def pending(self, key: SheetKey) -> List[Tuple[int, str, str, str]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, start_date, topic, status FROM outbox WHERE spreadsheet_id = ? AND sheet_name = ? ORDER BY id",
+                key,
+            ).fetchall()
+
+    def acknowledge(self, ids: List[int]):
+        if not ids:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+
+    # Count a failed replay; changes that keep failing are dropped
+    def record_failure(self, ids: List[int], error: str):
+        if not ids:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE outbox SET attempts = attempts + 1, last_error = ? WHERE id = ?", [(error, i) for i in ids]
+            )
+            dropped = self._conn.execute(
+                "SELECT start_date, topic, status FROM outbox WHERE attempts >= ?", (MAX_OUTBOX_ATTEMPTS,)
+            ).fetchall()
+            self._conn.execute("DELETE FROM outbox WHERE attempts >= ?", (MAX_OUTBOX_ATTEMPTS,))
+        for start_date, topic, status in dropped:
+            print(f"Giving up on writing '{status}' for {start_date}::{topic} after {MAX_OUTBOX_ATTEMPTS} attempts")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            tasks, = self._conn.execute("SELECT COUNT(*) FROM tasks").fetchone()
+            outbox, = self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()
+        return {"tasks": tasks, "outbox": outbox}
+
+    # Push queued changes to the sheet, then refresh the local rows from it.
+    # `load` reads the sheet; returns the number of changes written
+    def sync(self, key: SheetKey, load: Callable[[], RoadmapSnapshot]) -> int:
+        snapshot = load()
+        entries = self.pending(key)
+        written = 0
+
+        if entries and snapshot.status_col is None:
+            print(f"Error: 'Status' column not found in spreadsheet")
+            self.record_failure([entry[0] for entry in entries], "Status column not found")
+        elif entries:
+            # Latest status per task; rows are looked up again in case the sheet was reordered
+            latest: Dict[Tuple[str, str], Tuple[str, List[int]]] = {}
+            for entry_id, start_date, topic, status in entries:
+                ids = latest.get((start_date, topic), ("", []))[1]
+                latest[(start_date, topic)] = (status, ids + [entry_id])
+
+            rows = snapshot.rows_for_keys(list(latest))
+            missing = [i for (start_date, topic), (_, ids) in latest.items()
+                       if f"{start_date}::{topic}" not in rows for i in ids]
+            self.acknowledge(missing)  # the task is gone from the sheet
+
+            changes = {rows[f"{start_date}::{topic}"]: status for (start_date, topic), (status, _) in latest.items()
+                       if f"{start_date}::{topic}" in rows}
+            outcome = snapshot.write_statuses(changes)
+            done, failed = [], []
+            for (start_date, topic), (_, ids) in latest.items():
+                row_number = rows.get(f"{start_date}::{topic}")
+                if row_number is not None:
+                    (done if outcome.get(row_number) else failed).extend(ids)
+            self.acknowledge(done)
+            self.record_failure(failed, "status not written")
+            written = len(done)
+
+        self.replace(key, snapshot.header, snapshot.tasks)
+        return written
+
+
+# Status changes buffered for the store's outbox instead of the sheet
+class OutboxWriteBuffer(StatusWriteBuffer):
+    def __init__(self, store: TaskStore, key: SheetKey, status_col: int):
+        super().__init__(None, status_col)
+        self.store = store
+        self.key = key
+
+    def write_batch(self, changes: Dict[int, str]) -> Dict[int, bool]:
+        return self.store.set_statuses(self.key, changes, self.status_col)
+
+
+class StoreSnapshot(RoadmapSnapshot):
+    """A snapshot read from the task store; its status writes go to the outbox."""
+
+    def __init__(self, tasks: List[Task], header: List[str], store: TaskStore, key: SheetKey):
+        super().__init__(tasks, None, header)
+        self.store = store
+        self.key = key
+
+    def write_buffer(self) -> OutboxWriteBuffer:
+        return OutboxWriteBuffer(self.store, self.key, self.status_col)
@@ -0,0 +1,168 @@
+# Incremental sync: keep a local mirror of a worksheet and re-read only what changed
+import re
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from sheets.roadmap import MAX_RETRIES, RoadmapSnapshot, fetch_all_values, read_sheet
+from sheets.task import resolve_schema
+
+if TYPE_CHECKING:
+    import gspread
+
+# Constants
+KEY_COLUMNS = ("Start Date", "Deadline", "Topic")  # a change here re-reads the whole row
+STATUS_COLUMN = "Status"  # a change here is patched in place
+FULL_SYNC_RATIO = 0.2  # re-download everything when more rows than this changed
+FULL_SYNC_INTERVAL = 60 * 60  # seconds; edits to other columns show up after at most this long
+
+
+# Column letter(s) for a 1-indexed column, e.g. 1 -> "A", 27 -> "AA"
+def column_letter(col: int) -> str:
+    from gspread.utils import rowcol_to_a1
+    return re.sub(r"\d", "", rowcol_to_a1(1, col))
+
+
+# Group sorted row numbers into (first, last) runs of consecutive rows
+def row_runs(rows: List[int]) -> List[Tuple[int, int]]:
+    runs: List[Tuple[int, int]] = []
+    for row in rows:
+        if runs and row == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], row)
+        else:
+            runs.append((row, row))
+    return runs
+
+
+def _trimmed(row: List[str]) -> List[str]:
+    end = len(row)
+    while end and row[end - 1] == "":
+        end -= 1
+    return row[:end]
+
+
+class RoadmapMirror:
+    """A local copy of one worksheet, refreshed with partial reads.
+
+    The first load downloads every row. Later syncs read only the header and
+    the Start Date, Deadline, Topic and Status columns in one values:batchGet,
+    diff them against the mirror, patch Status changes in place and re-read
+    the full rows whose other key cells changed. Sheets exposes no per-cell
+    revision data, so edits to the remaining columns (Subtopic, Notes, ...)
+    are only picked up by the periodic full sync every ``full_sync_interval``
+    seconds, or when the header or a large share of rows changes.
+    """
+
+    def __init__(self, sheet_name: str = "ROADMAP", spreadsheet_id: Optional[str] = None,
+                 full_sync_interval: float = FULL_SYNC_INTERVAL):
+        self.sheet_name = sheet_name
+        self.spreadsheet_id = spreadsheet_id
+        self.full_sync_interval = full_sync_interval
+        self.rows: List[List[str]] = []  # header first, as get_all_values() returns them
+        self.synced_at = 0.0
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+        self.rows_fetched = 0
+
+    @property
+    def header(self) -> List[str]:
+        return self.rows[0] if self.rows else []
+
+    def snapshot(self, max_retries: int = MAX_RETRIES) -> RoadmapSnapshot:
+        sheet = self.sync(max_retries)
+        header = self.header
+        return RoadmapSnapshot(resolve_schema(header).tasks(self.rows[1:]), sheet, header)
+
+    # Bring the mirror up to date and return the worksheet handle
+    def sync(self, max_retries: int = MAX_RETRIES) -> "gspread.Worksheet":
+        if not self.rows or time.monotonic() - self.synced_at >= self.full_sync_interval:
+            return self.full_sync(max_retries)
+
+        columns = self._watched_columns()
+        if not columns:
+            return self.full_sync(max_retries)
+
+        ranges = ["1:1"] + [f"{column_letter(col)}2:{column_letter(col)}" for col in columns.values()]
+        results, sheet = read_sheet(lambda s: s.batch_get(ranges, major_dimension="COLUMNS"),
+                                    self.sheet_name, max_retries, self.spreadsheet_id, "batch_get")
+        header = [column[0] if column else "" for column in results[0]]  # read column-major too
+        if _trimmed(list(header)) != _trimmed(self.header):
+            print("Sheet header changed, downloading the whole sheet...")
+            return self.full_sync(max_retries)
+
+        remote = {name: (result[0] if result else []) for name, result in zip(columns, results[1:])}
+        row_count = max(len(values) for values in remote.values())
+        changed_rows, status_changes = self._diff(columns, remote, row_count)
+
+        if len(changed_rows) > max(1, FULL_SYNC_RATIO * (len(self.rows) - 1)):
+            print(f"{len(changed_rows)} rows changed, downloading the whole sheet...")
+            return self.full_sync(max_retries)
+
+        # Rows past the end of the key columns were cleared or deleted
+        del self.rows[row_count + 1:]
+        for row_number, value in status_changes.items():
+            self._set_cell(row_number, columns[STATUS_COLUMN], value)
+        if changed_rows:
+            sheet = self._fetch_rows(changed_rows, max_retries)
+
+        self.incremental_syncs += 1
+        return sheet
+
+    def full_sync(self, max_retries: int = MAX_RETRIES) -> "gspread.Worksheet":
+        self.rows, sheet = read_sheet(fetch_all_values, self.sheet_name, max_retries, self.spreadsheet_id)
+        self.synced_at = time.monotonic()
+        self.full_syncs += 1
+        self.rows_fetched += len(self.rows)
+        return sheet
+
+    # Header name -> 1-indexed column for the columns the incremental sync reads
+    def _watched_columns(self) -> Dict[str, int]:
+        header = self.header
+        names = [name for name in KEY_COLUMNS + (STATUS_COLUMN,) if name in header]
+        if not any(name in KEY_COLUMNS for name in names):
+            return {}
+        return {name: header.index(name) + 1 for name in names}
+
+    # Rows whose key cells differ (or are new), and Status-only changes
+    def _diff(self, columns: Dict[str, int], remote: Dict[str, List[str]],
+              row_count: int) -> Tuple[List[int], Dict[int, str]]:
+        local_rows = self.rows[1:row_count + 1]
+        changed = set(range(len(local_rows) + 2, row_count + 2))  # rows the mirror does not have yet
+        status_changes: Dict[int, str] = {}
+        for name, col in columns.items():
+            values = remote[name]
+            for i, row in enumerate(local_rows):
+                value = values[i] if i < len(values) else ""
+                if (row[col - 1] if col - 1 < len(row) else "") == value:
+                    continue
+                if name == STATUS_COLUMN:
+                    status_changes[i + 2] = value  # +2 for header offset
+                else:
+                    changed.add(i + 2)
+        for row_number in changed:
+            status_changes.pop(row_number, None)
+        return sorted(changed), status_changes
+
+    # Re-read whole rows, one range per run of consecutive rows, in a single request
+    def _fetch_rows(self, row_numbers: List[int], max_retries: int) -> "gspread.Worksheet":
+        last_column = column_letter(len(self.header))
+        runs = row_runs(row_numbers)
+        ranges = [f"A{first}:{last_column}{last}" for first, last in runs]
+        results, sheet = read_sheet(lambda s: s.batch_get(ranges), self.sheet_name, max_retries, self.spreadsheet_id,
+                                    "batch_get")
+
+        for (first, last), values in zip(runs, results):
+            for row_number in range(first, last + 1):
+                offset = row_number - first
+                row = list(values[offset]) if offset < len(values) else []
+                while len(self.rows) < row_number:
+                    self.rows.append([])
+                self.rows[row_number - 1] = row
+        self.rows_fetched += len(row_numbers)
+        return sheet
+
+    # Replace the row rather than editing it: tasks of snapshots already handed
+    # out hold the old list, and must keep the cells their parsed fields came from
+    def _set_cell(self, row_number: int, col: int, value: str):
+        row = list(self.rows[row_number - 1])
+        row.extend([""] * (col - len(row)))
+        row[col - 1] = value
+        self.rows[row_number - 1] = row
@@ -0,0 +1,181 @@
+# Compact task records: one slotted object per sheet row instead of a dict
+from collections.abc import MutableMapping
+from datetime import date
+from enum import Enum
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+from sheets.index import parse_date
+
+# Columns the bot reads: once a sheet's header is known, loads download only these
+TASK_COLUMNS = (
+    "Start Date", "Deadline", "Topic", "Subtopic", "Language Focus",
+    "Resource Link", "Project Idea", "Notes", "Status",
+)
+OPTIONAL_COLUMNS = ("Project Idea", "Notes")  # rendered only when present
+
+
+class Status(str, Enum):
+    NONE = ""
+    PENDING = "Pending"
+    DONE = "Done"
+    MISSED = "Missed"
+
+    # The known status in a cell, or None for anything else (kept verbatim in the row)
+    @classmethod
+    def parse(cls, value: str) -> Optional["Status"]:
+        return _STATUSES.get(value.strip())
+
+
+_STATUSES = {status.value: status for status in Status}
+
+
+class TaskSchema:
+    """Column positions for one header, built once and shared by every Task of a load.
+
+    A projected schema (see ``projection()``) covers only some of the sheet's
+    columns: its cells hold just those, and ``sheet_columns`` says where each
+    one sits in the sheet.
+    """
+
+    __slots__ = ("header", "columns", "start_col", "deadline_col", "topic_col", "status_col",
+                 "sheet_columns", "runs", "_projection")
+
+    def __init__(self, header: List[str], sheet_columns: Optional[List[int]] = None):
+        self.header = header
+        self.columns: Dict[str, int] = {name: i for i, name in enumerate(header)}  # last duplicate wins, as dicts did
+        self.start_col = self.columns.get("Start Date")
+        self.deadline_col = self.columns.get("Deadline")
+        self.topic_col = self.columns.get("Topic")
+        self.status_col = self.columns.get("Status")
+        self.sheet_columns = sheet_columns if sheet_columns is not None else list(range(len(header)))  # 0-indexed
+        # (first, last) sheet columns of each block of adjacent columns, one range read each
+        self.runs: List[Tuple[int, int]] = []
+        for col in self.sheet_columns:
+            if self.runs and col == self.runs[-1][1] + 1:
+                self.runs[-1] = (self.runs[-1][0], col)
+            else:
+                self.runs.append((col, col))
+        self._projection: Optional[TaskSchema] = None
+
+    # 1-indexed sheet column of a header name, if present
+    def sheet_column(self, name: str) -> Optional[int]:
+        col = self.columns.get(name)
+        return None if col is None else self.sheet_columns[col] + 1
+
+    # Whether a header read from the sheet is this one (trailing blank cells aside)
+    def matches(self, header: List[str]) -> bool:
+        return _trimmed(header) == _trimmed(self.header)
+
+    # The schema of a read limited to TASK_COLUMNS, or None if that is every column anyway
+    def projection(self) -> Optional["TaskSchema"]:
+        if self._projection is None:
+            cols = sorted(self.columns[name] for name in TASK_COLUMNS if name in self.columns)
+            self._projection = self if len(cols) == len(self.header) else TaskSchema(
+                [self.header[c] for c in cols], [self.sheet_columns[c] for c in cols])
+        return None if self._projection is self else self._projection
+
+    # Rows of a projected read, one block of rows per run, joined into cells in header order
+    def join(self, blocks: List[List[List[str]]]) -> List[List[str]]:
+        widths = [last - first + 1 for first, last in self.runs]
+        rows = []
+        for i in range(max((len(block) for block in blocks), default=0)):
+            cells: List[str] = []
+            for block, width in zip(blocks, widths):
+                part = block[i] if i < len(block) else []
+                cells.extend(part)
+                cells.extend([""] * (width - len(part)))
+            rows.append(cells)
+        return rows
+
+    def task(self, cells: List[str], row: Optional[int] = None) -> "Task":
+        return Task(self, cells, row)
+
+    # Tasks for the rows under the header (sheet row 2 onwards)
+    def tasks(self, rows: List[List[str]]) -> List["Task"]:
+        return [Task(self, cells, i + 2) for i, cells in enumerate(rows)]
+
+
+def _trimmed(header: List[str]) -> List[str]:
+    end = len(header)
+    while end and header[end - 1] == "":
+        end -= 1
+    return list(header[:end])
+
+
+# One schema per distinct header, so loads of an unchanged sheet share it and a
+# header is checked only the first time it is seen
+def resolve_schema(header: List[str]) -> TaskSchema:
+    return _resolve(tuple(header))
+
+
+@lru_cache(maxsize=256)
+def _resolve(header: Tuple[str, ...]) -> TaskSchema:
+    schema = TaskSchema(list(header))
+    missing = [name for name in TASK_COLUMNS if name not in schema.columns and name not in OPTIONAL_COLUMNS]
+    if missing:
+        print(f"Warning: the roadmap header has no {', '.join(missing)} column(s)")
+    return schema
+
+
+class Task(MutableMapping):
+    """One roadmap row.
+
+    Keeps the row's cells as read from the sheet and looks text columns up
+    by header name only when asked, so ``task["Topic"]`` and ``task.get()``
+    work as they did on the old per-row dicts. Start date, deadline and
+    status are parsed once on load. ``row`` is the sheet row the task was
+    read from (1-indexed, header included).
+    """
+
+    __slots__ = ("schema", "cells", "row", "start", "deadline", "status")
+
+    def __init__(self, schema: TaskSchema, cells: List[str], row: Optional[int] = None):
+        self.schema = schema
+        self.cells = cells
+        self.row = row
+        self.start: Optional[date] = parse_date(self._cell(schema.start_col) or "")
+        self.deadline: Optional[date] = parse_date(self._cell(schema.deadline_col) or "")
+        self.status: Optional[Status] = Status.parse(self._cell(schema.status_col) or "")
+
+    def _cell(self, col: Optional[int]) -> Optional[str]:
+        if col is None:
+            return None
+        return self.cells[col] if col < len(self.cells) else ""
+
+    def __getitem__(self, name: str) -> str:
+        return self._cell(self.schema.columns[name])
+
+    def get(self, name: str, default=None):
+        col = self.schema.columns.get(name)
+        return default if col is None else self._cell(col)
+
+    # "Start Date::Topic", as task_key() builds it (a missing column reads as None)
+    @property
+    def key(self) -> str:
+        return f"{self._cell(self.schema.start_col)}::{self._cell(self.schema.topic_col)}"
+
+    # Copy on write: the cells may be shared with a sheet mirror
+    def __setitem__(self, name: str, value: str):
+        col = self.schema.columns[name]
+        cells = list(self.cells)
+        cells.extend([""] * (col + 1 - len(cells)))
+        cells[col] = value
+        self.cells = cells
+        if col == self.schema.start_col:
+            self.start = parse_date(value)
+        elif col == self.schema.deadline_col:
+            self.deadline = parse_date(value)
+        elif col == self.schema.status_col:
+            self.status = Status.parse(value)
+
+    def __delitem__(self, name: str):
+        raise TypeError("Task columns cannot be removed")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.schema.columns)
+
+    def __len__(self) -> int:
+        return len(self.schema.columns)
+
+    def __repr__(self) -> str:
+        return f"Task({dict(self)!r})"
@@ -0,0 +1,12 @@
+# Settings for the tests: placeholders, nothing here reaches Google or Telegram
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("BOT_TOKEN", "0:test")
+os.environ.setdefault("SPREADSHEET_ID", "test")
+os.environ.setdefault("SERVICE_ACCOUNT_PATH", "test.json")
+os.environ.setdefault("SUBSCRIPTIONS_PATH", os.path.join(tempfile.mkdtemp(), "subscriptions.json"))
+os.environ.setdefault("ALLOWED_CHAT_IDS", "")
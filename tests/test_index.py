@@ -0,0 +1,42 @@
+# Status transitions computed from the TaskIndex columns
+from datetime import date, timedelta
+from sheets.index import TaskIndex
+from sheets.task import resolve_schema
+
+HEADER = ["Start Date", "Deadline", "Topic", "Status"]
+TODAY = date(2026, 3, 10)
+
+
+def _index(*rows):
+    return TaskIndex(resolve_schema(HEADER).tasks([list(row) for row in rows]))
+
+
+def _day(offset: int) -> str:
+    return (TODAY + timedelta(days=offset)).strftime("%d-%m-%Y")
+
+
+def test_overdue_pending_skips_other_statuses_and_undated_rows():
+    index = _index(
+        (_day(-2), _day(1), "A", "Pending"),
+        (_day(-2), _day(1), "B", "Done"),
+        ("", _day(1), "C", "Pending"),
+        (_day(0), _day(1), "D", "Pending"),
+        ("not a date", _day(1), "E", "Pending"),
+        (_day(-9), _day(1), "F", "Pending"),
+    )
+    assert index.overdue_pending(TODAY) == [0, 5]
+
+
+def test_transitions_leave_done_rows_and_unchanged_statuses_alone():
+    index = _index(
+        (_day(-1), _day(1), "A", "Pending"),
+        (_day(0), _day(1), "B", ""),
+        (_day(0), _day(1), "C", "Done"),
+        (_day(0), _day(1), "D", "Pending"),
+        (_day(-3), _day(1), "E", ""),
+    )
+    assert index.transitions(TODAY, pending_days=[TODAY], missed_days=[TODAY - timedelta(days=3)]) == {
+        0: "Missed", 1: "Pending", 4: "Missed",
+    }
+    index.set_status(0, "Missed")
+    assert index.overdue_pending(TODAY) == []
@@ -0,0 +1,28 @@
+# Scheduler lease backends
+import pytest
+from bot.leader import FileLeaseBackend, LeaseBackend, SqliteLeaseBackend
+
+
+def test_incomplete_backend_fails_when_created():
+    class NoRelease(LeaseBackend):
+        def acquire(self, name, holder, ttl):
+            return True
+
+        def current(self, name):
+            return None
+
+    with pytest.raises(TypeError):
+        NoRelease()
+
+
+@pytest.mark.parametrize("make", [
+    lambda tmp_path: FileLeaseBackend(str(tmp_path / "leases")),
+    lambda tmp_path: SqliteLeaseBackend(str(tmp_path / "leases.db")),
+])
+def test_one_holder_until_release(tmp_path, make):
+    backend = make(tmp_path)
+    assert backend.acquire("scheduler", "a", 30)
+    assert not backend.acquire("scheduler", "b", 30)
+    assert backend.current("scheduler")[0] == "a"
+    backend.release("scheduler", "a")
+    assert backend.acquire("scheduler", "b", 30)
@@ -0,0 +1,19 @@
+# Which day a fan-out marks missed tasks by
+from datetime import date, datetime, timezone
+from bot.delivery import DeliveryBucket
+from bot.scheduler import FanoutRun
+from bot.sender import local_time
+
+AT = datetime(2026, 3, 10, 6, 30, tzinfo=timezone.utc)
+
+
+def test_bucket_run_uses_the_bucket_day():
+    bucket = DeliveryBucket("America/Los_Angeles", "23:30")
+    run = FanoutRun(None, None, AT, bucket=bucket)
+    assert run.earliest_today({"1": local_time(AT, "Pacific/Auckland")}, AT) == date(2026, 3, 9)
+
+
+def test_run_for_everyone_uses_the_earliest_local_day():
+    run = FanoutRun(None, None, AT)
+    now_by_chat = {"1": local_time(AT, "Pacific/Auckland"), "2": local_time(AT, "America/Los_Angeles")}
+    assert run.earliest_today(now_by_chat, AT) == date(2026, 3, 9)
@@ -0,0 +1,27 @@
+# Replicas sharing one subscriptions file
+from bot.subscriptions import SubscriptionRegistry
+
+
+def test_replicas_do_not_overwrite_each_other(tmp_path):
+    path = str(tmp_path / "subscriptions.json")
+    first, second = SubscriptionRegistry(path), SubscriptionRegistry(path)
+
+    first.subscribe("1")
+    second.subscribe("2")  # loaded before "1" existed
+    first.subscribe("1", timezone="Africa/Accra")
+
+    assert {s.chat_id for s in SubscriptionRegistry(path).all()} == {"1", "2"}
+    assert {s.chat_id for s in first.all()} == {"1", "2"}
+    assert second.get("1").timezone == "Africa/Accra"
+
+
+def test_unsubscribe_elsewhere_is_seen(tmp_path):
+    path = str(tmp_path / "subscriptions.json")
+    first, second = SubscriptionRegistry(path), SubscriptionRegistry(path)
+    first.subscribe("1")
+    first.subscribe("2")
+
+    assert second.unsubscribe("1")
+    assert [s.chat_id for s in first.all()] == ["2"]
+    assert not first.unsubscribe("1")
+    assert len(first) == 1
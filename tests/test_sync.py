@@ -0,0 +1,30 @@
+# Incremental sync against an in-memory worksheet
+import pytest
+from bench.fakes import FakeClientManager, FakeWorksheet, synthetic_roadmap
+from sheets.client import set_client_manager
+from sheets.sync import RoadmapMirror
+from sheets.task import Status
+
+
+@pytest.fixture
+def worksheet():
+    sheet = FakeWorksheet(synthetic_roadmap(50))
+    set_client_manager(FakeClientManager({"ROADMAP": sheet}))
+    yield sheet
+    set_client_manager(None)
+
+
+def test_resync_leaves_earlier_snapshots_alone(worksheet):
+    mirror = RoadmapMirror()
+    status_col = worksheet.values[0].index("Status")
+    row = next(i for i, values in enumerate(worksheet.values) if values[status_col] == "Done")
+    old = mirror.snapshot()
+    task = old.tasks[row - 1]
+
+    worksheet.values[row][status_col] = "Missed"
+    new = mirror.snapshot()
+
+    assert mirror.incremental_syncs == 1
+    assert new.tasks[row - 1]["Status"] == "Missed"
+    assert task["Status"] == "Done"
+    assert task.status is Status.DONE